@@ -0,0 +1,774 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# Analytics Engines - pre-aggregated query structures for the dashboard
+# Built once per dataset version; panels query these instead of raw rows
+# ══════════════════════════════════════════════════════════════════════════════
+
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from cex_data import UNKNOWN_REGION, user_keys
+
+# ══════════════════════════════════════════════════════════════════════════════
+# HYPERLOGLOG DISTINCT-COUNT SKETCHES
+# One row of 2^p uint8 registers per group; rows merge with element-wise max
+# ══════════════════════════════════════════════════════════════════════════════
+
+HLL_PRECISION = 10  # 1024 registers per sketch
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_RELATIVE_ERROR = 1.04 / np.sqrt(HLL_REGISTERS)  # ~3.3% standard error
+
+
+def hash_user_ids(user_ids):
+    """64-bit hashes of user IDs (string labels or integer keys)."""
+    return pd.util.hash_array(np.asarray(user_ids))
+
+
+def hll_sketches(hashes, group_codes, n_groups):
+    """Build one HLL sketch per group from 64-bit hashes in a single pass."""
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    register = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.int64)
+    # Rank = leading zeros + 1 of the bits after the register index. The top
+    # 32 of those bits are exact in float64, so log2 gives the bit length.
+    rest = ((hashes << np.uint64(HLL_PRECISION)) >> np.uint64(32)).astype(np.float64)
+    with np.errstate(divide='ignore'):
+        rank = np.where(rest > 0, 32 - np.floor(np.log2(rest)), 33).astype(np.uint8)
+    sketches = np.zeros((n_groups, HLL_REGISTERS), dtype=np.uint8)
+    np.maximum.at(sketches, (np.asarray(group_codes, dtype=np.int64), register), rank)
+    return sketches
+
+
+def hll_merge(sketches, group_codes=None, n_groups=None):
+    """Union of sketches: all rows into one, or rows into n_groups groups."""
+    if group_codes is None:
+        return sketches.max(axis=0, initial=0)
+    merged = np.zeros((n_groups, sketches.shape[1]), dtype=np.uint8)
+    np.maximum.at(merged, np.asarray(group_codes, dtype=np.int64), sketches)
+    return merged
+
+
+def hll_estimate(sketches):
+    """Distinct-count estimate per sketch row (a scalar for a single sketch)."""
+    regs = np.atleast_2d(sketches).astype(np.float64)
+    m = regs.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.exp2(-regs).sum(axis=1)
+    zeros = (regs == 0).sum(axis=1)
+    # Linear counting is more accurate while many registers are still empty
+    with np.errstate(divide='ignore'):
+        small = m * np.log(m / np.maximum(zeros, 1))
+    est = np.where((raw <= 2.5 * m) & (zeros > 0), small, raw)
+    return est[0] if np.ndim(sketches) == 1 else est
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# DATE RANGE SLICING
+# Tables are kept sorted by date, so a range is two binary searches
+# ══════════════════════════════════════════════════════════════════════════════
+
+def date_range_rows(dates, start=None, end=None):
+    """Row slice of a date-sorted column covering days start..end inclusive.
+    df.iloc[rows] is a view of the table rather than a boolean-mask copy."""
+    dates = np.asarray(dates)
+    lo, hi = 0, len(dates)
+    if start is not None:
+        lo = np.searchsorted(dates, np.datetime64(start, 'D').astype(dates.dtype), side='left')
+    if end is not None:
+        hi = np.searchsorted(dates, (np.datetime64(end, 'D') + 1).astype(dates.dtype), side='left')
+    return slice(int(lo), int(hi))
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CATEGORY FILTER INDEX
+# Packed row bitmap per dimension value; OR within a column, AND across columns
+# ══════════════════════════════════════════════════════════════════════════════
+
+class CategoryIndex:
+    """Inverted index from dimension values to row bitmaps for one frame.
+    mask(coin=[...], channel=[...]) unions the selected values' bitmaps per
+    column and intersects the columns, touching n/8 bytes per value instead
+    of comparing every row. Resolved masks are kept in an LRU keyed by the
+    selection, so an unchanged sidebar costs one dict lookup per rerun; the
+    LRU is shared by every session and locked. extra maps further dimension
+    names to arrays aligned with df's rows (e.g. a user attribute joined
+    onto trades); missing values match no selection."""
+
+    def __init__(self, df, columns, extra=None, max_masks=32):
+        self.n_rows = len(df)
+        self.bitmaps = {}
+        dims = {col: df[col] for col in columns}
+        dims.update(extra or {})
+        for col, values in dims.items():
+            codes, uniques = pd.factorize(values)
+            self.bitmaps[col] = {value: np.packbits(codes == i) for i, value in enumerate(uniques)}
+        self.max_masks = max_masks
+        self._masks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, selections):
+        # Columns whose selection covers every value put no restriction on rows
+        key = []
+        for col, values in sorted(selections.items()):
+            if values is None:
+                continue
+            selected = frozenset(values) & self.bitmaps[col].keys()
+            if len(selected) < len(self.bitmaps[col]):
+                key.append((col, tuple(sorted(selected))))
+        return tuple(key)
+
+    def mask(self, **selections):
+        """Read-only boolean row mask for the given {column: values}; a
+        column passed as None is left unrestricted."""
+        key = self._key(selections)
+        with self._lock:
+            if key in self._masks:
+                self._masks.move_to_end(key)
+                return self._masks[key]
+        # Built outside the lock; sessions racing on one key build the same mask
+        packed = None
+        for col, values in key:
+            col_bits = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+            for value in values:
+                col_bits |= self.bitmaps[col][value]
+            packed = col_bits if packed is None else packed & col_bits
+        if packed is None:
+            mask = np.ones(self.n_rows, dtype=bool)
+        else:
+            mask = np.unpackbits(packed, count=self.n_rows).view(bool)
+        mask.flags.writeable = False
+        with self._lock:
+            self._masks[key] = mask
+            self._masks.move_to_end(key)
+            if len(self._masks) > self.max_masks:
+                self._masks.popitem(last=False)
+        return mask
+
+    def select(self, df, rows=slice(None), **selections):
+        """Rows of df (the frame the index was built from) within the row
+        slice rows that match the selection; a view when nothing is
+        filtered out."""
+        df = df.iloc[rows]
+        if not self._key(selections):
+            return df
+        return df[self.mask(**selections)[rows]]
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# USER DIMENSION
+# Dense arrays indexed by integer user key; a join is one np.take
+# ══════════════════════════════════════════════════════════════════════════════
+
+class UserDimension:
+    """User attributes addressable by integer user key.
+    Each attribute is stored as category codes in an array indexed by key
+    (-1 where no user has that key), so enriching or filtering trades by
+    region, KYC status or VIP level is a gather instead of a merge on
+    string IDs. Keys beyond the largest user key resolve to "unknown"."""
+
+    def __init__(self, users_df, columns):
+        keys = user_keys(users_df['user_id'])
+        self.size = int(keys.max(initial=0)) + 2  # last slot stays -1 for out-of-range keys
+        self.rows = np.full(self.size, -1, dtype=np.int64)
+        self.rows[keys] = np.arange(len(users_df))
+        self.codes = {}
+        self.categories = {}
+        for col in columns:
+            values = users_df[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, categories = values.cat.codes.to_numpy(), values.cat.categories
+            else:
+                codes, categories = pd.factorize(values, sort=True)
+            dense = np.full(self.size, -1, dtype=np.int16)
+            dense[keys] = codes
+            self.codes[col] = dense
+            self.categories[col] = categories
+
+    def _positions(self, user_ids):
+        keys = user_keys(user_ids)
+        return np.where((keys >= 0) & (keys < self.size), keys, self.size - 1)
+
+    def user_rows(self, user_ids):
+        """Row of each user ID in the users table, -1 for unknown users."""
+        return self.rows.take(self._positions(user_ids))
+
+    def take(self, user_ids, column, unknown=None):
+        """Attribute of each user ID as a Categorical: NaN for unknown users,
+        or the extra category `unknown` when one is given."""
+        codes = self.codes[column].take(self._positions(user_ids))
+        categories = self.categories[column]
+        if unknown is not None:
+            codes = np.where(codes < 0, len(categories), codes)
+            categories = categories.append(pd.Index([unknown]))
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+    def isin(self, user_ids, column, values):
+        """Boolean mask of user IDs whose attribute is one of values."""
+        wanted = self.categories[column].get_indexer(list(values))
+        return np.isin(self.codes[column].take(self._positions(user_ids)), wanted[wanted >= 0])
+
+    def bitsets(self, column):
+        """{value: packed bitset over user keys} for every value of column."""
+        codes = self.codes[column]
+        return {value: np.packbits(codes == i) for i, value in enumerate(self.categories[column])}
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# TRADE ROLLUP CUBE
+# date x coin x channel x trade_type x region cells: volume, fees, trades, user sketch
+# ══════════════════════════════════════════════════════════════════════════════
+
+CUBE_KEYS = ['date', 'coin', 'channel', 'trade_type', 'region']
+CUBE_TRADE_COLUMNS = CUBE_KEYS[:-1] + ['user_id', 'volume_usd', 'fee']  # Raw trade columns a cube reads
+CALENDAR_COLUMNS = ['weekday', 'iso_week', 'month']  # 0 = Monday; ISO week 1-53; month 1-12
+
+
+def calendar_columns(dates):
+    """Integer calendar dimensions for a datetime column, so weekday or
+    week rollups group on small ints instead of per-row day-name strings."""
+    dates = pd.Series(dates)
+    return pd.DataFrame({
+        'weekday': dates.dt.weekday.astype(np.int8),
+        'iso_week': dates.dt.isocalendar().week.astype(np.int8),
+        'month': dates.dt.month.astype(np.int8),
+    }, index=dates.index)
+
+
+def _cube_keys(trades_df, users):
+    """Group keys for CUBE_KEYS: the trade columns plus each trader's region
+    from the UserDimension users (UNKNOWN_REGION for unknown users)."""
+    region = users.take(trades_df['user_id'], 'region', UNKNOWN_REGION)
+    keys = [trades_df[k] for k in CUBE_KEYS[:-1]]
+    keys.append(pd.Series(region, index=trades_df.index, name='region'))
+    return keys
+
+
+class TradeCube:
+    """Daily trade rollup with a distinct-user sketch per cell.
+    cells holds one row per non-empty cube cell; sketches[i] is the HLL
+    sketch of the users who traded in cells.iloc[i]; cells also carry the
+    CALENDAR_COLUMNS of their date. region is the trader's region joined
+    from the user dimension (UNKNOWN_REGION for unknown users). Filtering
+    and grouping touch only the cells, so query cost depends on the number
+    of cells rather than the number of trades."""
+
+    approximate = False
+
+    def __init__(self, cells, sketches):
+        self.cells = cells
+        self.sketches = sketches
+        self.index = CategoryIndex(cells, ['coin', 'channel', 'region'])
+
+    @classmethod
+    def from_trades(cls, trades_df, users):
+        """Build from raw trades; users is the UserDimension for regions."""
+        grouped = trades_df.groupby(_cube_keys(trades_df, users), observed=True, sort=True, dropna=False)
+        cells = grouped.agg(
+            volume_usd=('volume_usd', 'sum'), fee=('fee', 'sum'), trades=('volume_usd', 'size'),
+        ).reset_index()
+        cells[CALENDAR_COLUMNS] = calendar_columns(cells['date'])
+        sketches = hll_sketches(hash_user_ids(trades_df['user_id'].to_numpy()), grouped.ngroup().to_numpy(),
+                                len(cells))
+        return cls(cells, sketches)
+
+    @classmethod
+    def from_batches(cls, batches, users):
+        """Build from a stream of trade chunks (e.g. DatasetStore.scan_days)
+        with one chunk of raw trades in memory at a time. Each chunk becomes
+        a partial cube; partial sums add up and partial sketches merge by
+        register max, so the result equals from_trades on all the rows."""
+        partials = [cls.from_trades(batch, users) for batch in batches]
+        if not partials:
+            empty = pd.DataFrame(columns=CUBE_TRADE_COLUMNS).astype({'date': 'datetime64[ns]', 'volume_usd': float,
+                                                                      'fee': float})
+            return cls.from_trades(empty, users)
+        cells = pd.concat([p.cells for p in partials], ignore_index=True)
+        # A cell appears in several partials only when a day spans chunks
+        grouped = cells.groupby(CUBE_KEYS, observed=True, sort=True, dropna=False)
+        merged = grouped[['volume_usd', 'fee', 'trades']].sum().reset_index()
+        merged[CALENDAR_COLUMNS] = calendar_columns(merged['date'])
+        sketches = hll_merge(np.concatenate([p.sketches for p in partials]), grouped.ngroup().to_numpy(), len(merged))
+        return cls(merged, sketches)
+
+    def filter(self, coins=None, channels=None, regions=None, start=None, end=None):
+        """Sub-cube restricted to the selected dimension values and to the
+        days start..end (cells are sorted by date first)."""
+        rows = date_range_rows(self.cells['date'], start, end)
+        mask = self.index.mask(coin=coins, channel=channels, region=regions)[rows]
+        return TradeCube(self.cells.iloc[rows][mask].reset_index(drop=True), self.sketches[rows][mask])
+
+    def total(self, column):
+        return self.cells[column].sum()
+
+    def sum_by(self, by, columns):
+        return self.cells.groupby(by, observed=True)[columns].sum().reset_index()
+
+    def distinct_users(self, by=None):
+        """Estimated distinct traders overall, or a Series per value of `by`."""
+        if by is None:
+            return int(round(hll_estimate(hll_merge(self.sketches)))) if len(self.cells) else 0
+        codes, uniques = pd.factorize(self.cells[by], sort=True)
+        merged = hll_merge(self.sketches, codes, len(uniques))
+        return pd.Series(np.round(hll_estimate(merged)).astype(np.int64), index=uniques, name='traders')
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# STRATIFIED SAMPLE CUBE
+# The cube rebuilt from a date x coin stratified trade sample; every sum
+# is an estimate with a 95% confidence interval
+# ══════════════════════════════════════════════════════════════════════════════
+
+SAMPLE_STRATA = ['date', 'coin']
+SAMPLE_MEASURES = ['volume_usd', 'fee', 'trades']
+Z_95 = 1.959964
+
+
+class SampleCube:
+    """TradeCube counterpart over a stratified sample (see
+    cex_data.stratified_sample). Cells hold sample sums and sums of squares
+    of each measure, plus the stratum population and sample sizes, so any
+    filter and group-by over cells yields the expanded total and the
+    variance of the stratified estimator (with finite population
+    correction). sum_by adds a <column>_ci 95% half-width per column."""
+
+    approximate = True
+
+    def __init__(self, cells):
+        self.cells = cells
+        self.index = CategoryIndex(cells, ['coin', 'channel', 'region'])
+
+    @classmethod
+    def from_sample(cls, sample_df, users):
+        """Build from sampled trades; users is the UserDimension for regions."""
+        keys = _cube_keys(sample_df, users)
+        measures = pd.DataFrame({
+            'volume_usd': sample_df['volume_usd'].to_numpy(np.float64),
+            'fee': sample_df['fee'].to_numpy(np.float64),
+            'trades': np.ones(len(sample_df)),
+        }, index=sample_df.index)
+        for col in SAMPLE_MEASURES:
+            measures[f"{col}_sq"] = measures[col] ** 2
+        measures['stratum_rows'] = sample_df['stratum_rows']
+        measures['stratum_sample'] = sample_df['stratum_sample']
+        agg = {col: 'sum' for col in measures.columns}
+        agg.update(stratum_rows='first', stratum_sample='first')
+        cells = measures.groupby(keys, observed=True, sort=True, dropna=False).agg(agg).reset_index()
+        cells[CALENDAR_COLUMNS] = calendar_columns(cells['date'])
+        return cls(cells)
+
+    def filter(self, coins=None, channels=None, regions=None, start=None, end=None):
+        rows = date_range_rows(self.cells['date'], start, end)
+        mask = self.index.mask(coin=coins, channel=channels, region=regions)[rows]
+        return SampleCube(self.cells.iloc[rows][mask].reset_index(drop=True))
+
+    def _estimate(self, by, columns):
+        """Estimates and variances per group of `by` (one row when empty).
+        Sample sums are first combined per group and stratum: inside a
+        stratum the group is a domain, whose total is w x sum(y) and whose
+        variance uses y zeroed outside the domain."""
+        keys = by + [k for k in SAMPLE_STRATA if k not in by]
+        sq = [f"{col}_sq" for col in columns]
+        agg = {col: 'sum' for col in columns + sq}
+        agg.update(stratum_rows='first', stratum_sample='first')
+        parts = self.cells.groupby(keys, observed=True).agg(agg)
+        N = parts['stratum_rows'].to_numpy(np.float64)
+        n = parts['stratum_sample'].to_numpy(np.float64)
+        # N^2 (1 - n/N) s^2 / n, with s^2 = (sum y^2 - (sum y)^2 / n) / (n - 1)
+        var_factor = np.where(n > 1, N * (N - n) / (n * np.maximum(n - 1, 1)), 0.0)
+        sums = parts[columns].to_numpy()
+        est = pd.DataFrame(sums * (N / n)[:, None], index=parts.index, columns=columns)
+        var = (parts[sq].to_numpy() - sums ** 2 / n[:, None]) * var_factor[:, None]
+        var = pd.DataFrame(np.maximum(var, 0), index=parts.index, columns=[f"{col}_ci" for col in columns])
+        if not by:
+            return pd.concat([est.sum(), var.sum()])
+        return est.groupby(level=by, observed=True).sum().join(var.groupby(level=by, observed=True).sum())
+
+    def total(self, column):
+        return self._estimate([], [column])[column]
+
+    def total_ci(self, column):
+        """95% half-width of total(column)."""
+        return Z_95 * np.sqrt(self._estimate([], [column])[f"{column}_ci"])
+
+    def sum_by(self, by, columns):
+        by = [by] if isinstance(by, str) else list(by)
+        columns = [columns] if isinstance(columns, str) else list(columns)
+        result = self._estimate(by, columns)
+        ci = [f"{col}_ci" for col in columns]
+        result[ci] = Z_95 * np.sqrt(result[ci])
+        return result.reset_index()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# ACTIVE USER ENGINE
+# last_active sorted once as day numbers; window counts via searchsorted
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _day_numbers(dates):
+    """Days since 1970-01-01 for a date, datetime, Timestamp or array of them."""
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+
+class ActiveUserIndex:
+    """Answers "users last active between day A and day B" for any window.
+    Building sorts the users once; every count afterwards is two binary
+    searches, and a whole period series is one vectorized searchsorted."""
+
+    def __init__(self, last_active):
+        self.days = np.sort(_day_numbers(pd.Series(last_active).to_numpy()))
+
+    def __len__(self):
+        return len(self.days)
+
+    def count(self, start, end):
+        """Users last active on any day in [start, end], inclusive."""
+        return int(self.window_counts([end], (_day_numbers(end) - _day_numbers(start)) + 1)[0])
+
+    def window_counts(self, ends, window_days):
+        """Active users in the window_days-long window ending at each date."""
+        ends = _day_numbers(ends)
+        hi = np.searchsorted(self.days, ends, side='right')
+        lo = np.searchsorted(self.days, ends - window_days + 1, side='left')
+        return hi - lo
+
+    def rolling(self, start, end, window_days=1):
+        """Series of window_days-rolling active users for every day in
+        [start, end]; window_days=1 is plain DAU, 7 is 7-day rolling."""
+        ends = np.arange(_day_numbers(start), _day_numbers(end) + 1).astype('datetime64[D]')
+        return pd.Series(self.window_counts(ends, window_days), index=pd.DatetimeIndex(ends), name='active_users')
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# FUNNEL ENGINE
+# Stages as packed bitsets over user keys; counts are AND + popcount
+# ══════════════════════════════════════════════════════════════════════════════
+
+_POPCOUNT_TABLE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+
+def user_bitset(keys, size):
+    """Packed bitset over user keys 0..size-1 with the given keys set;
+    keys outside that range are dropped."""
+    keys = np.asarray(keys, dtype=np.int64)
+    bits = np.zeros(size, dtype=bool)
+    bits[keys[(keys >= 0) & (keys < size)]] = True
+    return np.packbits(bits)
+
+
+def popcount(bits):
+    """Number of set bits in a packed bitset."""
+    if hasattr(np, 'bitwise_count'):  # NumPy >= 2.0
+        return int(np.bitwise_count(bits).sum(dtype=np.int64))
+    return int(_POPCOUNT_TABLE[bits].sum(dtype=np.int64))
+
+
+class Funnel:
+    """Ordered funnel over users. stages maps stage name -> packed bitset
+    (all over the same key space); stage i counts users present in every
+    stage up to i, so each step is one AND with the running set plus a
+    popcount. Segments are bitsets too and restrict the starting set."""
+
+    def __init__(self, stages):
+        self.stages = dict(stages)
+
+    def counts(self, segment=None):
+        """Users reaching each stage, as a Series in stage order."""
+        running = None if segment is None else segment
+        counts = []
+        for bits in self.stages.values():
+            running = bits if running is None else running & bits
+            counts.append(popcount(running))
+        return pd.Series(counts, index=list(self.stages), name='users')
+
+    def by_segment(self, segments):
+        """Stage counts per segment ({label: bitset}) as a segments x stages frame."""
+        return pd.DataFrame([self.counts(bits) for bits in segments.values()], index=list(segments))
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# USER FEATURE STORE
+# Mergeable per-user trading aggregates in dense arrays indexed by user key
+# ══════════════════════════════════════════════════════════════════════════════
+
+FEATURE_COLUMNS = ['trades', 'volume_usd', 'fees', 'first_trade', 'last_trade', 'favorite_coin']
+
+
+class UserFeatures:
+    """Per-user trade count, volume, fees, first/last trade day and
+    favorite coin (most trades). Only mergeable state is kept - sums,
+    min/max day numbers and per-coin trade counts - so update() folds in
+    newly appended trades in one grouped pass without revisiting old ones.
+    through is the last trade day folded in so far."""
+
+    _NO_TRADE = np.iinfo(np.int64).max
+
+    def __init__(self, coins):
+        # Row 0 is never a user key (keys start at 1); it stays empty and
+        # stands in for unknown users
+        self.coins = list(coins)
+        self.trades = np.zeros(1, dtype=np.int64)
+        self.volume_usd = np.zeros(1, dtype=np.float64)
+        self.fees = np.zeros(1, dtype=np.float64)
+        self.first_day = np.full(1, self._NO_TRADE)
+        self.last_day = np.full(1, -self._NO_TRADE)
+        self.coin_trades = np.zeros((1, len(self.coins)), dtype=np.int64)
+        self.through = None
+
+    def _grow(self, size):
+        extra = size - len(self.trades)
+        if extra <= 0:
+            return
+        self.trades = np.append(self.trades, np.zeros(extra, dtype=np.int64))
+        self.volume_usd = np.append(self.volume_usd, np.zeros(extra))
+        self.fees = np.append(self.fees, np.zeros(extra))
+        self.first_day = np.append(self.first_day, np.full(extra, self._NO_TRADE))
+        self.last_day = np.append(self.last_day, np.full(extra, -self._NO_TRADE))
+        self.coin_trades = np.vstack([self.coin_trades, np.zeros((extra, len(self.coins)), dtype=np.int64)])
+
+    def update(self, trades_df):
+        """Fold a batch of trades (any row order) into the aggregates."""
+        if not len(trades_df):
+            return self
+        keys = user_keys(trades_df['user_id'])
+        self._grow(int(keys.max()) + 1)
+        size = len(self.trades)
+        days = _day_numbers(trades_df['date'].to_numpy())
+        coin_codes = pd.Categorical(trades_df['coin'], categories=self.coins).codes.astype(np.int64)
+
+        self.trades += np.bincount(keys, minlength=size)
+        self.volume_usd += np.bincount(keys, weights=trades_df['volume_usd'].to_numpy(np.float64), minlength=size)
+        self.fees += np.bincount(keys, weights=trades_df['fee'].to_numpy(np.float64), minlength=size)
+        np.minimum.at(self.first_day, keys, days)
+        np.maximum.at(self.last_day, keys, days)
+        self.coin_trades += np.bincount(keys * len(self.coins) + coin_codes,
+                                        minlength=size * len(self.coins)).reshape(size, len(self.coins))
+        batch_end = pd.Timestamp(days.max().astype('datetime64[D]'))
+        self.through = batch_end if self.through is None else max(self.through, batch_end)
+        return self
+
+    def _frame(self, positions):
+        traded = self.trades[positions] > 0
+        first = self.first_day[positions].astype('datetime64[D]').astype('datetime64[ns]')
+        last = self.last_day[positions].astype('datetime64[D]').astype('datetime64[ns]')
+        favorite = np.where(traded, self.coin_trades[positions].argmax(axis=1), -1)
+        return pd.DataFrame({
+            'trades': self.trades[positions],
+            'volume_usd': self.volume_usd[positions],
+            'fees': self.fees[positions],
+            'first_trade': np.where(traded, first, np.datetime64('NaT')),
+            'last_trade': np.where(traded, last, np.datetime64('NaT')),
+            'favorite_coin': pd.Categorical.from_codes(favorite, categories=self.coins),
+        })
+
+    def frame(self):
+        """Features of every user with at least one trade, indexed by user key."""
+        keys = np.flatnonzero(self.trades)
+        return self._frame(keys).set_index(pd.Index(keys, name='user_key'))
+
+    def for_users(self, user_ids):
+        """Features aligned with user_ids; users without trades get zeros."""
+        keys = user_keys(user_ids)
+        return self._frame(np.where((keys > 0) & (keys < len(self.trades)), keys, 0))
+
+    def snapshot(self):
+        """Persistable frame of the mergeable state (users with trades)."""
+        keys = np.flatnonzero(self.trades)
+        df = pd.DataFrame({'user_key': keys, 'trades': self.trades[keys], 'volume_usd': self.volume_usd[keys],
+                           'fees': self.fees[keys], 'first_day': self.first_day[keys],
+                           'last_day': self.last_day[keys]})
+        for i, coin in enumerate(self.coins):
+            df[f'trades_{coin}'] = self.coin_trades[keys, i]
+        return df
+
+    @classmethod
+    def from_snapshot(cls, df, coins):
+        features = cls(coins)
+        if not len(df):
+            return features
+        keys = df['user_key'].to_numpy()
+        features._grow(int(keys.max()) + 1)
+        features.trades[keys] = df['trades'].to_numpy()
+        features.volume_usd[keys] = df['volume_usd'].to_numpy()
+        features.fees[keys] = df['fees'].to_numpy()
+        features.first_day[keys] = df['first_day'].to_numpy()
+        features.last_day[keys] = df['last_day'].to_numpy()
+        for i, coin in enumerate(features.coins):
+            features.coin_trades[keys, i] = df[f'trades_{coin}'].to_numpy()
+        features.through = pd.Timestamp(features.last_day[keys].max().astype('datetime64[D]'))
+        return features
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# COHORT RETENTION ENGINE
+# Distinct (user, day offset) activity pairs binned into cohort x offset counts
+# ══════════════════════════════════════════════════════════════════════════════
+
+def cohort_starts(days, freq='M'):
+    """First day of the monthly ('M') or Monday-based weekly ('W') cohort
+    containing each day number."""
+    days = np.asarray(days, dtype=np.int64)
+    if freq == 'W':
+        return days - (days + 3) % 7  # 1970-01-01 was a Thursday
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+
+
+def _count_at_least(groups, values, n_groups, width):
+    """[g, d] = number of rows in group g with value >= d, for d < width."""
+    values = np.clip(values, 0, width)
+    hist = np.bincount(groups * (width + 1) + values, minlength=n_groups * (width + 1))
+    return hist.reshape(n_groups, width + 1)[:, ::-1].cumsum(axis=1)[:, ::-1][:, :width]
+
+
+class CohortRetention:
+    """Retention matrices (cohort x day offset) from registration dates and
+    activity events, built in one vectorized pass over the events.
+
+    event_users are row positions into reg_dates; registering counts as
+    activity on day 0. Two readings of "retained at day N" are kept:
+    active exactly N days after registering, and (unbounded) active on
+    day N or any later day. A cell only counts users for whom day N is
+    observable: registered at least N days before as_of and, for exact-day
+    retention, with day N no earlier than observed_from, the first day
+    from which activity is fully recorded."""
+
+    def __init__(self, reg_dates, event_users, event_dates, as_of, freq='M', max_offset=90, observed_from=None):
+        reg_days = _day_numbers(pd.Series(reg_dates).to_numpy())
+        width = max_offset + 1
+        self.freq = freq
+        self.max_offset = max_offset
+        cohort_days, cohort = np.unique(cohort_starts(reg_days, freq), return_inverse=True)
+        n = len(cohort_days)
+        self.cohorts = pd.DatetimeIndex(cohort_days.astype('datetime64[D]'))
+        self.sizes = np.bincount(cohort, minlength=n)
+
+        as_of = int(_day_numbers(as_of))
+        observed_from = reg_days.min(initial=as_of) if observed_from is None else int(_day_numbers(observed_from))
+
+        # Distinct (user, offset) pairs; offsets past max_offset share one
+        # overflow slot, which only the unbounded reading needs
+        event_users = np.asarray(event_users, dtype=np.int64)
+        event_days = _day_numbers(event_dates)
+        offsets = event_days - reg_days[event_users]
+        keep = (offsets >= 0) & (event_days <= as_of)
+        pairs = np.sort(event_users[keep] * (width + 1) + np.minimum(offsets[keep], width))
+        pairs = pairs[np.append(True, pairs[1:] != pairs[:-1])] if len(pairs) else pairs
+        users, offsets = np.divmod(pairs, width + 1)
+        on = (offsets < width) & (reg_days[users] + offsets >= observed_from)
+        self.active_on = np.bincount(cohort[users[on]] * width + offsets[on],
+                                     minlength=n * width).reshape(n, width)
+
+        # Pairs are sorted by user then offset: the last pair per user is
+        # that user's latest activity
+        last = np.zeros(len(reg_days), dtype=np.int64)
+        is_last = np.append(users[1:] != users[:-1], True) if len(users) else np.zeros(0, dtype=bool)
+        last[users[is_last]] = offsets[is_last]
+        self.active_on_or_after = _count_at_least(cohort, last, n, width)
+
+        self.eligible_unbounded = _count_at_least(cohort, as_of - reg_days, n, width)
+        # Day N of a user is unobserved while N < observed_from - registration
+        unobserved = _count_at_least(cohort, observed_from - reg_days, n, width + 1)[:, 1:]
+        self.eligible_on = self.eligible_unbounded - unobserved
+        self.active_on[:, 0] = self.eligible_on[:, 0]
+
+    def _counts(self, unbounded):
+        if unbounded:
+            return self.active_on_or_after, self.eligible_unbounded
+        return self.active_on, self.eligible_on
+
+    def retention(self, offsets, unbounded=False):
+        """Cohort x offset retention rates; NaN where no user is observable."""
+        offsets = list(offsets)
+        active, eligible = self._counts(unbounded)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = active[:, offsets] / np.where(eligible[:, offsets] > 0, eligible[:, offsets], np.nan)
+        return pd.DataFrame(rates, index=self.cohorts, columns=offsets)
+
+    def overall(self, offsets, unbounded=False):
+        """Retention at each offset pooled over every observable user."""
+        offsets = list(offsets)
+        active, eligible = self._counts(unbounded)
+        totals = eligible[:, offsets].sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = active[:, offsets].sum(axis=0) / np.where(totals > 0, totals, np.nan)
+        return pd.Series(rates, index=offsets, name='retention')
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# RESULT CACHE
+# Process-wide panel results, size-aware LRU under a byte budget
+# ══════════════════════════════════════════════════════════════════════════════
+
+def result_nbytes(value, _seen=None):
+    """Approximate in-memory size of a cached result: frames, arrays and
+    containers of them, or the attributes of an engine object."""
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(result_nbytes(k, seen) + result_nbytes(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(result_nbytes(v, seen) for v in value)
+    if hasattr(value, '__dict__'):
+        return result_nbytes(vars(value), seen)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """Memo of computed panel results shared by every session in the process.
+    Keys are (dataset version, filter tuple, panel id, ...). Each entry is
+    weighed with result_nbytes; once the total passes max_bytes the least
+    recently used entries are evicted. Values are shared between sessions,
+    so callers must treat them as read-only."""
+
+    def __init__(self, max_bytes=256 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        # Computed outside the lock so one slow panel doesn't block other
+        # sessions; concurrent misses on one key both compute, last one wins
+        value = compute()
+        size = result_nbytes(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, freed) = self._entries.popitem(last=False)
+                self.nbytes -= freed
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self.nbytes, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
@@ -9,28 +9,25 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import random
 import requests
 import json
 import time
 import hashlib
+import os
 import re
 
-# Conditional imports with fallback
-try:
-    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-    VADER_AVAILABLE = True
-except ImportError:
-    VADER_AVAILABLE = False
-
-try:
-    from sklearn.decomposition import LatentDirichletAllocation
-    from sklearn.feature_extraction.text import CountVectorizer
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
+from analytics import (CUBE_TRADE_COLUMNS, HLL_RELATIVE_ERROR, ActiveUserIndex, CategoryIndex, CohortRetention,
+                       Funnel, ResultCache, SampleCube, TradeCube, UserDimension, UserFeatures, date_range_rows,
+                       user_bitset)
+from cex_data import (DATASET_CACHE_DIR, CEXDataGenerator, DatasetStore, COINS, CHANNELS, REGIONS, UNKNOWN_REGION,
+                      process_pool, user_keys)
+from sentiment import SENTIMENT_FIELDS, VADER_AVAILABLE, CoinMatcher, SentimentCache, document_key, score_documents
+from topics import SKLEARN_AVAILABLE, OnlineTopicModel, TopicModelWarmer
 
+# Conditional imports with fallback (VADER and scikit-learn are resolved in
+# sentiment.py and topics.py)
 try:
     from openai import OpenAI
     OPENAI_AVAILABLE = True
@@ -294,7 +291,7 @@ TRANSLATIONS = {
         'wau': 'Weekly Active Users',
         'mau': 'Monthly Active Users',
         'retention_d1': 'D1 Retention',
-        'fee_revenue': 'Fee Revenue (30d)',
+        'fee_revenue': 'Fee Revenue (Period)',
         'avg_spread': 'Avg Spread (bps)',
         # Sub-tabs
         'volume_revenue': 'Volume & Revenue',
@@ -310,11 +307,22 @@ TRANSLATIONS = {
         'volume_heatmap': 'Volume Heatmap (Coin x Weekday)',
         'active_users_trend': 'Active Users Trend',
         'period_selector': 'Period',
+        'cohort_period': 'Cohort',
+        'retention_kind': 'Retained',
+        'retention_days': 'Retention Days',
         'new_users_by_channel': 'New Registrations by Channel',
         'user_funnel': 'User Conversion Funnel',
+        'funnel_segment': 'Segment Funnel By',
+        'vip_segments': 'Trader Segments by VIP Level',
+        'approx_mode': 'Approximate Mode',
+        'approx_help': 'Answer trade KPIs and charts from a stratified sample while exact results build in the background',
+        'approx_caption': 'Approximate: trade figures are estimated from a {:.0%} date x coin sample (±95% confidence interval); exact results replace them when ready.',
+        'exact_pending': 'Needs every trade: shown once exact results are ready.',
+        'topics_pending': 'The {} topic model is still fitting; showing {} topics until it is ready.',
         'users_by_channel': 'Users by Acquisition Channel',
         'cac_by_channel': 'CAC by Channel',
         'channel_performance': 'Channel Performance',
+        'traders_mode': 'Distinct Traders',
         'retention_curve': 'Retention Curve',
         'cohort_heatmap': 'Cohort Retention Heatmap',
         'exec_time_trend': 'Avg Execution Time (ms)',
@@ -349,6 +357,7 @@ TRANSLATIONS = {
         # Footer
         'data_source': 'Data Source',
         'last_updated': 'Last Updated',
+        'result_cache': 'Result Cache',
         # Channels - maps to CEX channel operations
         'organic': 'Organic',
         'kol_referral': 'KOL Referral',
@@ -383,7 +392,7 @@ TRANSLATIONS = {
         'wau': '周活跃用户',
         'mau': '月活跃用户',
         'retention_d1': '次日留存率',
-        'fee_revenue': '手续费收入 (30天)',
+        'fee_revenue': '手续费收入 (所选区间)',
         'avg_spread': '平均价差 (bps)',
         'volume_revenue': '交易量与收入',
         'user_growth': '用户增长',
@@ -397,11 +406,22 @@ TRANSLATIONS = {
         'volume_heatmap': '交易量热力图 (币种 x 星期)',
         'active_users_trend': '活跃用户趋势',
         'period_selector': '周期',
+        'cohort_period': '队列',
+        'retention_kind': '留存口径',
+        'retention_days': '留存天数',
         'new_users_by_channel': '按渠道新增注册',
         'user_funnel': '用户转化漏斗',
+        'funnel_segment': '漏斗分组维度',
+        'vip_segments': 'VIP 等级交易用户分层',
+        'approx_mode': '近似查询模式',
+        'approx_help': '交易 KPI 与图表先由分层抽样估算，精确结果在后台计算',
+        'approx_caption': '近似结果：交易指标由按日期 x 币种分层的 {:.0%} 样本估算（±95% 置信区间），精确结果就绪后自动替换。',
+        'exact_pending': '该指标需要全部交易数据，精确结果就绪后显示。',
+        'topics_pending': '{} 个主题的模型仍在训练中，暂时显示 {} 个主题的结果。',
         'users_by_channel': '按渠道获客用户数',
         'cac_by_channel': '各渠道获客成本',
         'channel_performance': '渠道表现',
+        'traders_mode': '去重交易用户',
         'retention_curve': '留存曲线',
         'cohort_heatmap': '队列留存热力图',
         'exec_time_trend': '平均执行时间 (ms)',
@@ -432,6 +452,7 @@ TRANSLATIONS = {
         'sparkline': '7日走势',
         'data_source': '数据来源',
         'last_updated': '最后更新',
+        'result_cache': '结果缓存',
         'organic': '自然流量',
         'kol_referral': 'KOL 推荐',
         'paid_ads': '付费广告',
@@ -448,16 +469,16 @@ def t(key):
 # CONSTANTS
 # ══════════════════════════════════════════════════════════════════════════════
 
-COINS = ["BTC", "ETH", "SOL", "BNB", "XRP", "ADA", "DOGE", "AVAX", "DOT", "MATIC"]
-COIN_WEIGHTS = [0.30, 0.25, 0.10, 0.08, 0.06, 0.05, 0.05, 0.04, 0.04, 0.03]
-COIN_AVG_TRADE = {"BTC": 5000, "ETH": 2000, "SOL": 800, "BNB": 1000, "XRP": 500,
-                  "ADA": 300, "DOGE": 200, "AVAX": 600, "DOT": 400, "MATIC": 250}
-CHANNELS = ["Organic", "KOL Referral", "Paid Ads", "Social Media", "Airdrop Campaign"]
-CHANNEL_WEIGHTS = [0.35, 0.20, 0.20, 0.15, 0.10]
 CHANNEL_CAC = {"Organic": 0, "KOL Referral": 25, "Paid Ads": 45, "Social Media": 30, "Airdrop Campaign": 15}
-REGIONS = ["Asia", "Europe", "North America", "South America", "Africa", "Oceania"]
-REGION_WEIGHTS = [0.45, 0.25, 0.15, 0.08, 0.04, 0.03]
 SCALE_FACTOR = 10  # Scale display metrics to represent platform-level data
+DATA_WORKERS = 1  # >1 generates dataset partitions in a process pool
+SENTIMENT_WORKERS = 1  # >1 scores large batches of unseen headlines in a process pool
+COMPACT_SCHEMA = False  # True: integer user keys, category dims, float32 money columns
+RESULT_CACHE_BYTES = 256 * 1024 ** 2  # Budget for panel results shared across sessions
+RETENTION_OFFSETS = [1, 3, 7, 14, 30, 60, 90]  # Selectable retention days
+TRADE_SCAN_ROWS = 1_000_000  # Raw trades held in memory at once while building the cube
+SAMPLE_FRACTION = 0.05  # Share of each date x coin stratum kept for approximate mode
+TOPIC_COUNTS = range(3, 11)  # n_topics slider values, all pre-fitted in the background
 
 # CoinGecko coin ID mapping for API
 COINGECKO_IDS = {
@@ -490,202 +511,173 @@ def apply_dark_theme(fig):
     )
     return fig
 
-# ══════════════════════════════════════════════════════════════════════════════
-# CEX DATA GENERATOR
-# Generates realistic CEX trading data for dashboard demo
-# Supports daily data extraction and dashboard KPIs per job description
-# ══════════════════════════════════════════════════════════════════════════════
-
-class CEXDataGenerator:
-    """Generate realistic centralized exchange data for CEX analytics."""
-
-    def __init__(self, seed=42):
-        random.seed(seed)
-        np.random.seed(seed)
-
-    def generate_trades_df(self, days=30):
-        """Generate trade records. ~4000 trades/day, scaled x10 for display.
-        CEX relevance: daily data extraction, trading volume analysis."""
-        end_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        records = []
-        for day_offset in range(days):
-            date = end_date - timedelta(days=days - 1 - day_offset)
-            is_weekend = date.weekday() >= 5
-            base_trades = int(4000 * (0.7 if is_weekend else 1.0) * np.random.uniform(0.85, 1.15))
-
-            coins = np.random.choice(COINS, size=base_trades, p=COIN_WEIGHTS)
-            channels = np.random.choice(CHANNELS, size=base_trades, p=CHANNEL_WEIGHTS)
-            trade_types = np.random.choice(["spot", "futures"], size=base_trades, p=[0.70, 0.30])
-
-            for i in range(base_trades):
-                coin = coins[i]
-                avg = COIN_AVG_TRADE[coin]
-                volume = max(10, avg * np.random.lognormal(0, 0.8))
-                fee_rate = np.random.uniform(0.0008, 0.0012)
-                records.append({
-                    'date': date,
-                    'user_id': f"U{np.random.randint(1, 100000):05d}",
-                    'coin': coin,
-                    'volume_usd': round(volume, 2),
-                    'fee': round(volume * fee_rate, 2),
-                    'channel': channels[i],
-                    'trade_type': trade_types[i],
-                })
-
-        return pd.DataFrame(records)
-
-    def generate_users_df(self, n_users=10000):
-        """Generate user registration data.
-        CEX relevance: user growth metrics, DAU/WAU/MAU, acquisition cost analysis."""
-        end_date = datetime.now()
-        reg_dates = [end_date - timedelta(days=int(np.random.exponential(60))) for _ in range(n_users)]
-        last_actives = [rd + timedelta(days=min(int(np.random.exponential(15)), (end_date - rd).days))
-                        for rd in reg_dates]
-        # Clamp last_active to not exceed now
-        last_actives = [min(la, end_date) for la in last_actives]
-
-        regions = np.random.choice(REGIONS, size=n_users, p=REGION_WEIGHTS)
-        channels = np.random.choice(CHANNELS, size=n_users, p=CHANNEL_WEIGHTS)
-        kyc = np.random.choice(["Verified", "Pending", "Not Started"], size=n_users, p=[0.60, 0.25, 0.15])
-        vip = np.random.choice([0, 1, 2, 3, 4, 5], size=n_users, p=[0.70, 0.15, 0.08, 0.04, 0.02, 0.01])
-
-        return pd.DataFrame({
-            'user_id': [f"U{i:05d}" for i in range(1, n_users + 1)],
-            'registration_date': reg_dates,
-            'last_active': last_actives,
-            'region': regions,
-            'channel': channels,
-            'kyc_status': kyc,
-            'vip_level': vip,
-        })
-
-    def generate_order_book_metrics(self, days=30):
-        """Generate order book quality metrics per coin per day.
-        CEX relevance: liquidity monitoring, execution quality dashboard."""
-        end_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        records = []
-        for day_offset in range(days):
-            date = end_date - timedelta(days=days - 1 - day_offset)
-            for coin in COINS:
-                base_spread = {"BTC": 3, "ETH": 4, "SOL": 8, "BNB": 6}.get(coin, 10)
-                records.append({
-                    'date': date,
-                    'coin': coin,
-                    'avg_spread_bps': round(base_spread * np.random.uniform(0.8, 1.3), 1),
-                    'avg_exec_time_ms': round(np.random.uniform(50, 180), 0),
-                    'fill_rate': round(np.random.uniform(0.95, 0.995), 3),
-                })
-        return pd.DataFrame(records)
-
-    def generate_retention_cohorts(self):
-        """Generate monthly retention cohort data.
-        CEX relevance: user retention analysis, cohort-based growth tracking."""
-        cohorts = []
-        for i in range(6):
-            month = (datetime.now() - timedelta(days=30 * i)).strftime('%Y-%m')
-            size = np.random.randint(2000, 5000)
-            # Crypto retention is typically lower than general apps
-            d1 = round(np.random.uniform(0.40, 0.55), 3)
-            d7 = round(np.random.uniform(0.25, 0.35), 3)
-            d14 = round(np.random.uniform(0.18, 0.28), 3)
-            d30 = round(np.random.uniform(0.12, 0.22), 3)
-            cohorts.append({
-                'cohort': month, 'cohort_size': size,
-                'd1': d1, 'd7': d7, 'd14': d14, 'd30': d30
-            })
-        return pd.DataFrame(cohorts)
-
-    def generate_news_corpus(self, n=150):
-        """Generate realistic crypto news headlines as fallback.
-        CEX relevance: sentiment analysis, market intelligence."""
-        templates_positive = [
-            "{coin} surges {pct}% as institutional adoption accelerates",
-            "Exchange reports record {coin} trading volume amid market rally",
-            "{coin} breaks key resistance level, analysts predict further gains",
-            "Major bank announces {coin} custody service, boosting market confidence",
-            "{coin} ecosystem sees explosive DeFi growth, TVL hits new ATH",
-            "Regulatory clarity for {coin} drives positive market sentiment",
-            "{coin} network upgrade completed successfully, transaction fees drop 40%",
-            "Exchange launches {coin} staking program with competitive APY",
-            "Whale accumulation of {coin} signals long-term bullish outlook",
-            "{coin} partnership with Fortune 500 company announced",
-        ]
-        templates_negative = [
-            "{coin} drops {pct}% amid broader market sell-off concerns",
-            "Security vulnerability found in {coin} protocol raises concerns",
-            "Regulatory crackdown threatens {coin} adoption in key markets",
-            "{coin} faces network congestion issues, users report delays",
-            "Large {coin} holder liquidated, triggering cascade of sell orders",
-            "FUD spreads as {coin} faces potential delisting from exchanges",
-            "{coin} development team faces internal disputes, roadmap delayed",
-            "Market analysts warn of potential {coin} bear cycle ahead",
-        ]
-        templates_neutral = [
-            "{coin} consolidates near ${price} level as traders await catalyst",
-            "Exchange adds new {coin} trading pairs for Asian markets",
-            "{coin} trading volume remains steady at ${vol}M daily average",
-            "Analysis: What {coin} on-chain data reveals about market direction",
-            "Exchange implements enhanced KYC for {coin} derivatives trading",
-            "{coin} hash rate reaches new milestone, network security strengthens",
-            "Weekly recap: {coin} price action and key technical levels",
-            "Industry report: {coin} market share among top exchanges analyzed",
-        ]
-        sources = ["CoinDesk", "CoinTelegraph", "The Block", "Decrypt", "Bloomberg Crypto",
-                    "Reuters Digital", "Exchange Research", "Messari", "Glassnode", "CryptoSlate"]
-
-        np.random.seed(42)
-        news = []
-        for i in range(n):
-            coin = np.random.choice(COINS)
-            pct = np.random.randint(2, 25)
-            price = np.random.randint(100, 70000)
-            vol = np.random.randint(50, 500)
-            sentiment_type = np.random.choice(["positive", "negative", "neutral"], p=[0.4, 0.25, 0.35])
-
-            if sentiment_type == "positive":
-                template = np.random.choice(templates_positive)
-            elif sentiment_type == "negative":
-                template = np.random.choice(templates_negative)
-            else:
-                template = np.random.choice(templates_neutral)
-
-            title = template.format(coin=coin, pct=pct, price=price, vol=vol)
-            pub_date = datetime.now() - timedelta(hours=np.random.randint(1, 72 * 5))
-
-            news.append({
-                'title': title,
-                'description': f"Detailed analysis of {coin} market dynamics and trading patterns on the exchange.",
-                'published_at': pub_date.isoformat(),
-                'source': {'title': np.random.choice(sources)},
-                'currencies': [{'code': coin}],
-            })
-
-        return sorted(news, key=lambda x: x['published_at'], reverse=True)
-
-
 # ══════════════════════════════════════════════════════════════════════════════
 # CACHED DATA LOADING
 # ══════════════════════════════════════════════════════════════════════════════
 
-@st.cache_data(ttl=600)
-def load_trades_data(days=30):
-    gen = CEXDataGenerator(seed=42)
-    return gen.generate_trades_df(days)
-
-@st.cache_data(ttl=600)
-def load_users_data():
-    gen = CEXDataGenerator(seed=42)
-    return gen.generate_users_df()
+# Datasets are read from the on-disk store and shared read-only across
+# sessions (cache_resource), so they are never pickled per rerun.
 
-@st.cache_data(ttl=600)
+@st.cache_resource(ttl=600)
+def load_trades_data(days=30):
+    """Raw trades, stored per day: after a date change only the new day is
+    generated. Rollups come from load_trade_cube."""
+    gen = CEXDataGenerator(seed=42, workers=DATA_WORKERS, compact=COMPACT_SCHEMA)
+    end_date = dataset_end_date()
+    dates = pd.date_range(end=end_date, periods=days, freq='D')
+    params = {'seed': 42, 'compact': COMPACT_SCHEMA}
+    return DatasetStore().load_days('trades', params, dates, gen.iter_trade_days)
+
+@st.cache_resource(ttl=600)
+def load_trade_cube(days=30):
+    """Rollup cube behind the Core Metrics tab, built once per dataset.
+    Trade day files are scanned in chunks with only the cube's columns, so
+    the window never has to fit in memory as one frame."""
+    gen = CEXDataGenerator(seed=42, workers=DATA_WORKERS, compact=COMPACT_SCHEMA)
+    end_date = dataset_end_date()
+    dates = pd.date_range(end=end_date, periods=days, freq='D')
+    params = {'seed': 42, 'compact': COMPACT_SCHEMA}
+    chunks = DatasetStore().scan_days('trades', params, dates, gen.iter_trade_days, columns=CUBE_TRADE_COLUMNS,
+                                      batch_rows=TRADE_SCAN_ROWS)
+    return TradeCube.from_batches(chunks, load_user_dimension())
+
+@st.cache_resource(ttl=600)
+def load_trade_sample(days=30):
+    """Cube over the stratified trade sample, stored per day next to the
+    full trades, for approximate mode."""
+    gen = CEXDataGenerator(seed=42, workers=DATA_WORKERS, compact=COMPACT_SCHEMA)
+    end_date = dataset_end_date()
+    dates = pd.date_range(end=end_date, periods=days, freq='D')
+    params = {'seed': 42, 'compact': COMPACT_SCHEMA, 'fraction': SAMPLE_FRACTION}
+    sample_df = DatasetStore().load_days('trades_sample', params, dates, lambda missing: gen.iter_trade_sample_days(
+        missing, SAMPLE_FRACTION))
+    return SampleCube.from_sample(sample_df, load_user_dimension())
+
+@st.cache_resource
+def get_background_executor():
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix='exact-results')
+
+@st.cache_resource(ttl=600)
+def exact_results_future(days=30):
+    """Future of the exact trade cube. Building it also warms every other
+    trade-backed resource, so once it is done nothing is left to wait for."""
+    def build():
+        cube = load_trade_cube(days)
+        load_category_index('trades')
+        load_retention_engine()
+        load_user_features(days)
+        return cube
+    return get_background_executor().submit(build)
+
+@st.cache_resource(ttl=600)
+def load_users_data(n_users=10000):
+    gen = CEXDataGenerator(seed=42, workers=DATA_WORKERS, compact=COMPACT_SCHEMA)
+    end_date = dataset_end_date()
+    params = {'seed': 42, 'n_users': n_users, 'end_date': end_date.date(), 'compact': COMPACT_SCHEMA,
+              'sort': 'registration_date'}
+    # Stored sorted by registration date so date ranges slice with searchsorted
+    return DatasetStore().load_or_build('users', params, lambda: gen.generate_users_df(n_users, end_date=end_date)
+                                        .sort_values('registration_date', kind='stable', ignore_index=True))
+
+@st.cache_resource(ttl=600)
 def load_order_book_data(days=30):
-    gen = CEXDataGenerator(seed=42)
-    return gen.generate_order_book_metrics(days)
-
-@st.cache_data(ttl=600)
-def load_retention_data():
-    gen = CEXDataGenerator(seed=42)
-    return gen.generate_retention_cohorts()
+    gen = CEXDataGenerator(seed=42, workers=DATA_WORKERS)
+    end_date = dataset_end_date()
+    dates = pd.date_range(end=end_date, periods=days, freq='D')
+    return DatasetStore().load_days('order_book', {'seed': 42}, dates, gen.iter_order_book_days)
+
+@st.cache_resource(ttl=600)
+def load_user_dimension():
+    """User attributes by integer key, for joining users onto trades."""
+    return UserDimension(load_users_data(), ['region', 'channel', 'kyc_status', 'vip_level'])
+
+@st.cache_resource(ttl=600)
+def load_user_features(days=30):
+    """Lifetime per-user trading features. The stored snapshot is extended
+    with loaded trade days it has not seen, so a rollover folds in one day.
+    Days between the snapshot and the loaded window (the server was down
+    for longer than the window) are regenerated and folded in one by one."""
+    trades_df = load_trades_data(days)
+    store = DatasetStore()
+    params = {'seed': 42, 'compact': COMPACT_SCHEMA}
+    snapshot = store.load_snapshot('user_features', params)
+    features = UserFeatures(COINS) if snapshot is None else UserFeatures.from_snapshot(snapshot, COINS)
+    start = None if features.through is None else features.through + timedelta(days=1)
+    backfilled = False
+    if start is not None and len(trades_df) and start < trades_df['date'].iloc[0]:
+        gen = CEXDataGenerator(seed=42, workers=DATA_WORKERS, compact=COMPACT_SCHEMA)
+        gap = pd.date_range(start, trades_df['date'].iloc[0] - timedelta(days=1), freq='D')
+        for day_df in gen.iter_trade_days(gap):
+            features.update(day_df)
+        start, backfilled = None, True
+    new_rows = date_range_rows(trades_df['date'], start=start)
+    if backfilled or new_rows.stop > new_rows.start:
+        features.update(trades_df.iloc[new_rows])
+        store.save_snapshot(features.snapshot(), 'user_features', params)
+    return features
+
+@st.cache_resource(ttl=600)
+def load_category_index(dataset):
+    """Sidebar filter index over a loaded dataset, built once per dataset."""
+    if dataset == 'trades':
+        trades_df = load_trades_data()
+        region = load_user_dimension().take(trades_df['user_id'], 'region', UNKNOWN_REGION)
+        return CategoryIndex(trades_df, ['coin', 'channel'], extra={'region': region})
+    if dataset == 'users':
+        return CategoryIndex(load_users_data(), ['channel', 'region'])
+    return CategoryIndex(load_order_book_data(), ['coin'])
+
+@st.cache_resource(ttl=600)
+def load_retention_engine(freq='M'):
+    """Cohort retention from registration dates and trade activity.
+    Activity is every trade day plus each user's last_active day; trades
+    by IDs missing from the users table are ignored. Exact-day retention
+    only counts days inside the trade window, where activity is complete."""
+    users_df = load_users_data()
+    trades_df = load_trades_data()
+    rows = load_user_dimension().user_rows(trades_df['user_id'])
+    known = rows >= 0
+    event_users = np.concatenate([rows[known], np.arange(len(users_df))])
+    event_dates = np.concatenate([trades_df['date'].to_numpy()[known].astype('datetime64[D]'),
+                                  users_df['last_active'].to_numpy().astype('datetime64[D]')])
+    today = dataset_end_date()
+    return CohortRetention(users_df['registration_date'], event_users, event_dates, as_of=today, freq=freq,
+                           max_offset=max(RETENTION_OFFSETS), observed_from=trades_df['date'].iloc[0])
+
+@st.cache_resource
+def get_dataset_day():
+    """Day the cached datasets were built for, shared by all sessions."""
+    return {'end_date': None}
+
+def dataset_end_date():
+    """Last day of every dataset window. The first call on a new day clears
+    the dated loaders, so each one rebuilds for that day instead of serving
+    yesterday's window until its ttl runs out."""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    state = get_dataset_day()
+    if state['end_date'] != today:
+        for loader in (load_trades_data, load_trade_cube, load_trade_sample, exact_results_future, load_users_data,
+                       load_order_book_data, load_user_dimension, load_user_features, load_category_index,
+                       load_retention_engine):
+            loader.clear()
+        state['end_date'] = today
+    return state['end_date']
+
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(max_bytes=RESULT_CACHE_BYTES)
+
+def dataset_version():
+    """Datasets regenerate deterministically per window end day and schema;
+    the day is the one this run's datasets were loaded for (see main)."""
+    return (st.session_state.dataset_day.isoformat(), COMPACT_SCHEMA)
+
+def cached_result(panel, filters, compute, *extra):
+    """Panel result shared by all sessions, keyed by dataset version, the
+    normalized sidebar filters, panel id and any panel-local options."""
+    filter_key = (tuple(filters['date_range']),) + tuple(
+        tuple(sorted(filters[k])) for k in ('coins', 'channels', 'regions')) + (filters['approximate'],)
+    return get_result_cache().get_or_compute((dataset_version(), filter_key, panel) + extra, compute)
 
 @st.cache_data(ttl=600)
 def load_news_corpus():
@@ -783,69 +775,70 @@ COIN_KEYWORDS = {
     "MATIC": ["matic", "polygon"],
 }
 
+@st.cache_resource
+def get_coin_matcher():
+    """Whole-word coin matcher compiled once from COIN_KEYWORDS."""
+    return CoinMatcher(COIN_KEYWORDS)
+
+
 def extract_coins_from_text(text):
     """Extract mentioned coins from news text."""
-    text_lower = text.lower()
-    found = []
-    for coin, keywords in COIN_KEYWORDS.items():
-        if any(kw in text_lower for kw in keywords):
-            found.append(coin)
-    return found if found else ["GENERAL"]
+    return get_coin_matcher().find(text)
+
+
+@st.cache_resource
+def get_sentiment_cache(scorer):
+    """Per-document scores for one scorer, shared by every session and
+    persisted next to the dataset cache."""
+    return SentimentCache(os.path.join(DATASET_CACHE_DIR, f"sentiment-{scorer}.jsonl"))
+
+
+@st.cache_resource
+def get_sentiment_pool():
+    """Scoring workers kept for the life of the server, so each one imports
+    VADER and builds its analyzer once. None when scoring runs in-process."""
+    return process_pool(SENTIMENT_WORKERS) if SENTIMENT_WORKERS > 1 else None
 
 
 @st.cache_data(ttl=300)
 def analyze_sentiment(news_items):
-    """Run VADER sentiment on news corpus. Returns DataFrame with scores."""
+    """Run VADER sentiment on news corpus. Returns DataFrame with scores.
+    Scores are cached per document (hash of title + description), so a
+    refresh only scores items that have not been seen before, in batches.
+    Without VADER a keyword scorer reads the headlines instead."""
+    scorer = 'vader' if VADER_AVAILABLE else 'keyword'
+    titles = [item.get('title', '') for item in news_items]
+    texts = [f"{title}. {item.get('description', '')}" for title, item in zip(titles, news_items)]
+    keys = [document_key(title, item.get('description', '')) for title, item in zip(titles, news_items)]
+    # The keyword fallback only reads headlines, for coins as well
     if not VADER_AVAILABLE:
-        # Fallback: simple keyword-based sentiment
-        results = []
-        for item in news_items:
-            title = item.get('title', '')
-            pos_words = ['surge', 'rally', 'gain', 'bull', 'boost', 'record', 'positive', 'growth', 'breakout', 'adoption']
-            neg_words = ['drop', 'crash', 'sell', 'bear', 'fear', 'hack', 'risk', 'decline', 'crackdown', 'vulnerability']
-            title_lower = title.lower()
-            pos_count = sum(1 for w in pos_words if w in title_lower)
-            neg_count = sum(1 for w in neg_words if w in title_lower)
-            compound = (pos_count - neg_count) * 0.3
-            compound = max(-1, min(1, compound))
-            label = "Bullish" if compound > 0.05 else ("Bearish" if compound < -0.05 else "Neutral")
-            coins = extract_coins_from_text(title)
-            pub = item.get('published_at', datetime.now().isoformat())
-            source = item.get('source', {})
-            if isinstance(source, dict):
-                source = source.get('title', 'Unknown')
-            results.append({
-                'title': title, 'published_at': pub, 'source': source,
-                'compound': round(compound, 3), 'pos': max(0, compound),
-                'neg': max(0, -compound), 'neu': 1 - abs(compound),
-                'sentiment_label': label, 'coins': coins
-            })
-        return pd.DataFrame(results)
-
-    analyzer = SentimentIntensityAnalyzer()
-    results = []
+        texts = titles
+
+    cache = get_sentiment_cache(scorer)
+    scores = cache.get_many(keys)
+    unseen = {key: i for i, (key, found) in enumerate(zip(keys, scores)) if found is None}
+    if unseen:
+        columns = score_documents([texts[i] for i in unseen.values()], scorer, workers=SENTIMENT_WORKERS,
+                                  pool=get_sentiment_pool())
+        rows = np.column_stack([columns[f] for f in SENTIMENT_FIELDS]).tolist()
+        new_scores = dict(zip(unseen, rows))
+        cache.put_many(new_scores)
+        scores = [new_scores[key] if found is None else found for key, found in zip(keys, scores)]
+
+    # Handle source field (may be dict from CryptoPanic or str from fallback)
+    sources = []
     for item in news_items:
-        title = item.get('title', '')
-        desc = item.get('description', '')
-        text = f"{title}. {desc}"
-        scores = analyzer.polarity_scores(text)
-        compound = scores['compound']
-        label = "Bullish" if compound > 0.05 else ("Bearish" if compound < -0.05 else "Neutral")
-        coins = extract_coins_from_text(text)
-
-        # Handle source field (may be dict from CryptoPanic or str from fallback)
-        pub = item.get('published_at', datetime.now().isoformat())
         source = item.get('source', {})
-        if isinstance(source, dict):
-            source = source.get('title', 'Unknown')
-
-        results.append({
-            'title': title, 'published_at': pub, 'source': source,
-            'compound': round(compound, 3), 'pos': round(scores['pos'], 3),
-            'neg': round(scores['neg'], 3), 'neu': round(scores['neu'], 3),
-            'sentiment_label': label, 'coins': coins,
-        })
-    return pd.DataFrame(results)
+        sources.append(source.get('title', 'Unknown') if isinstance(source, dict) else source)
+
+    sentiment_df = pd.DataFrame(scores, columns=SENTIMENT_FIELDS) if scores else pd.DataFrame(columns=SENTIMENT_FIELDS)
+    sentiment_df.insert(0, 'title', titles)
+    sentiment_df.insert(1, 'published_at', [item.get('published_at', datetime.now().isoformat()) for item in news_items])
+    sentiment_df.insert(2, 'source', sources)
+    compound = sentiment_df['compound'].to_numpy(dtype=float)
+    sentiment_df['sentiment_label'] = np.where(compound > 0.05, "Bullish", np.where(compound < -0.05, "Bearish", "Neutral"))
+    sentiment_df['coins'] = get_coin_matcher().find_series(texts)
+    return sentiment_df
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -853,31 +846,34 @@ def analyze_sentiment(news_items):
 # LDA on news corpus - demonstrates NLP skills
 # ══════════════════════════════════════════════════════════════════════════════
 
-@st.cache_data(ttl=600)
+def topic_model_path(n_topics):
+    return os.path.join(DATASET_CACHE_DIR, f"topics-{n_topics}.pkl")
+
+@st.cache_resource
+def get_topic_model(n_topics):
+    """Online LDA model for n_topics, shared by every session and restored
+    from disk, so a restart resumes from the last fitted state."""
+    return OnlineTopicModel.load(topic_model_path(n_topics), n_topics)
+
+@st.cache_resource
+def get_topic_warmer():
+    return TopicModelWarmer(run_topic_modeling, TOPIC_COUNTS)
+
 def run_topic_modeling(texts, n_topics=5, n_top_words=10):
-    """Run LDA topic modeling. Returns topics list and doc-topic distributions."""
+    """Run LDA topic modeling. Returns topics list and doc-topic distributions.
+    The persisted model is only updated with headlines it has not seen.
+    Called by the topic warmer for every n_topics value of a new corpus."""
     if not SKLEARN_AVAILABLE or len(texts) < 10:
         return [], np.array([])
 
-    vectorizer = CountVectorizer(max_df=0.95, min_df=2, max_features=1000, stop_words='english')
-    try:
-        doc_term_matrix = vectorizer.fit_transform(texts)
-    except ValueError:
+    model = get_topic_model(n_topics)
+    seen = model.n_docs
+    doc_topics = model.update(list(texts))
+    if model.n_docs != seen:
+        model.save(topic_model_path(n_topics))
+    if len(doc_topics) == 0:
         return [], np.array([])
-
-    lda = LatentDirichletAllocation(n_components=n_topics, random_state=42, max_iter=10)
-    lda.fit(doc_term_matrix)
-
-    feature_names = vectorizer.get_feature_names_out()
-    topics = []
-    for idx, topic in enumerate(lda.components_):
-        top_indices = topic.argsort()[-n_top_words:][::-1]
-        words = [feature_names[i] for i in top_indices]
-        weights = [float(topic[i]) for i in top_indices]
-        topics.append({"topic_id": idx, "label": f"Topic {idx + 1}", "words": words, "weights": weights})
-
-    doc_topics = lda.transform(doc_term_matrix)
-    return topics, doc_topics
+    return model.topics(n_top_words), doc_topics
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -888,17 +884,17 @@ def run_topic_modeling(texts, n_topics=5, n_top_words=10):
 
 def build_data_context(trades_df, users_df):
     """Build text summary of exchange data for LLM context window."""
-    now = datetime.now()
-    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
     yesterday = today - timedelta(days=1)
 
     # Active users
-    dau = users_df[users_df['last_active'].dt.date == yesterday.date()].shape[0]
-    mau = users_df[users_df['last_active'] >= (now - timedelta(days=30))].shape[0]
+    active = ActiveUserIndex(users_df['last_active'])
+    dau = active.count(yesterday, yesterday)
+    mau = active.count(today - timedelta(days=29), today)
 
     # Volume stats
-    vol_by_coin = trades_df.groupby('coin')['volume_usd'].sum().sort_values(ascending=False)
-    vol_by_channel = trades_df.groupby('channel')['volume_usd'].sum().sort_values(ascending=False)
+    vol_by_coin = trades_df.groupby('coin', observed=True)['volume_usd'].sum().sort_values(ascending=False)
+    vol_by_channel = trades_df.groupby('channel', observed=True)['volume_usd'].sum().sort_values(ascending=False)
     daily_vol = trades_df.groupby('date')['volume_usd'].sum()
     total_fees = trades_df['fee'].sum()
 
@@ -1029,12 +1025,21 @@ def show_sidebar():
 
     # Date range
     st.sidebar.markdown(f"### 📅 {t('date_range')}")
+    default_range = ((datetime.now() - timedelta(days=30)).date(), datetime.now().date())
     date_range = st.sidebar.date_input(
         t('date_range'),
-        value=(datetime.now() - timedelta(days=30), datetime.now()),
+        value=default_range,
         max_value=datetime.now(),
         label_visibility="collapsed"
     )
+    # While only the start has been picked, the range runs through today;
+    # a cleared input falls back to the default window
+    if len(date_range) == 2:
+        date_range = tuple(date_range)
+    elif len(date_range) == 1:
+        date_range = (date_range[0], datetime.now().date())
+    else:
+        date_range = default_range
 
     # Coin filter
     st.sidebar.markdown(f"### 🪙 {t('coin_filter')}")
@@ -1054,11 +1059,17 @@ def show_sidebar():
 
     # Region filter
     st.sidebar.markdown(f"### 🌍 {t('region_filter')}")
+    # Trades by users missing from the users table are kept under their own region
+    region_options = REGIONS + [UNKNOWN_REGION]
     selected_regions = st.sidebar.multiselect(
-        t('region_filter'), REGIONS, default=REGIONS, label_visibility="collapsed"
+        t('region_filter'), region_options, default=region_options, label_visibility="collapsed"
     )
     if not selected_regions:
-        selected_regions = REGIONS
+        selected_regions = region_options
+
+    # Approximate mode: sampled trade figures while exact ones build
+    st.sidebar.markdown("---")
+    approximate = st.sidebar.toggle(t('approx_mode'), value=False, help=t('approx_help'), key='approx_mode')
 
     # API Keys
     st.sidebar.markdown("---")
@@ -1073,6 +1084,7 @@ def show_sidebar():
     # Refresh button
     if st.sidebar.button(f"🔄 {t('refresh_data')}", use_container_width=True):
         st.cache_data.clear()
+        st.cache_resource.clear()
         st.rerun()
 
     return {
@@ -1080,6 +1092,7 @@ def show_sidebar():
         'coins': selected_coins,
         'channels': selected_channels,
         'regions': selected_regions,
+        'approximate': approximate,
     }
 
 
@@ -1089,36 +1102,61 @@ def show_sidebar():
 # CEX relevance: "build dashboards", "analyze growth trends"
 # ══════════════════════════════════════════════════════════════════════════════
 
-def show_core_metrics(trades_df, users_df, filters):
-    """Render Core Metrics tab with CEX KPIs and sub-tabs."""
-
-    # Filter data by selected coins and channels
-    tdf = trades_df[trades_df['coin'].isin(filters['coins']) & trades_df['channel'].isin(filters['channels'])]
-    udf = users_df[users_df['channel'].isin(filters['channels']) & users_df['region'].isin(filters['regions'])]
-
-    now = datetime.now()
-    yesterday = (now - timedelta(days=1)).date()
+def show_core_metrics(users_df, filters):
+    """Render Core Metrics tab with CEX KPIs and sub-tabs.
+    Trade figures come from the rollup cube, never from raw trades. In
+    approximate mode they come from the sample cube until the exact cube,
+    built in the background, is ready and swapped in."""
+    exact = exact_results_future() if filters['approximate'] else None
+    if exact is not None and exact.done() and exact.exception() is not None:
+        # The background build failed: build here, so the error is raised
+        # once in this run, and let a later run start a fresh future
+        exact_results_future.clear()
+        exact = None
+    if exact is None or exact.done():
+        trade_cube = load_trade_cube() if exact is None else exact.result()
+    else:
+        trade_cube = load_trade_sample()
+        st.caption(t('approx_caption').format(SAMPLE_FRACTION))
+        # Rerun until the exact results are in; the next run picks them up
+        if AUTOREFRESH_AVAILABLE:
+            st_autorefresh(interval=2000, limit=None, key="exact_refresh")
+    filters = dict(filters, approximate=trade_cube.approximate)
+
+    # Filtered views and every aggregate below go through the shared result
+    # cache, so a filter combination is computed once per process
+    cube, udf, active = cached_result('filtered', filters, lambda: _filter_core_data(trade_cube, users_df, filters))
+    filtered_ob = cached_result('order_book', filters, lambda: _filter_order_book(filters))
 
     # ── KPI Cards ──
-    total_vol = tdf['volume_usd'].sum() * SCALE_FACTOR
-    total_fees = tdf['fee'].sum() * SCALE_FACTOR
-    dau = udf[udf['last_active'].dt.date == yesterday].shape[0] * SCALE_FACTOR
-    mau = udf[udf['last_active'] >= (now - timedelta(days=30))].shape[0] * SCALE_FACTOR
-
-    ob_df = load_order_book_data()
-    avg_spread = ob_df[ob_df['coin'].isin(filters['coins'])]['avg_spread_bps'].mean()
-
-    ret_df = load_retention_data()
-    avg_d1 = ret_df['d1'].mean() * 100
+    def kpis():
+        start, end = filters['date_range']
+        yesterday = end - timedelta(days=1)
+        return (_days_in_range(trade_cube, start, end),
+                cube.total('volume_usd') * SCALE_FACTOR,
+                cube.total('fee') * SCALE_FACTOR,
+                active.count(yesterday, yesterday) * SCALE_FACTOR,
+                active.count(end - timedelta(days=29), end) * SCALE_FACTOR,
+                filtered_ob['avg_spread_bps'].mean(),
+                cube.total_ci('volume_usd') * SCALE_FACTOR if cube.approximate else 0.0,
+                cube.total_ci('fee') * SCALE_FACTOR if cube.approximate else 0.0)
+    n_days, total_vol, total_fees, dau, mau, avg_spread, vol_ci, fee_ci = cached_result('kpis', filters, kpis)
+
+    # Sample estimates show their 95% interval relative to the value
+    def with_ci(value, ci):
+        return f"${value:,.0f}" + (f" ±{ci / value:.1%}" if ci and value else "")
+
+    # Retention is built from every trade, so it waits for exact results
+    avg_d1 = None if trade_cube.approximate else load_retention_engine().overall([1])[1] * 100
 
     # KPI cards: 2 rows of 3 for better mobile layout
     r1c1, r1c2, r1c3 = st.columns(3)
-    r1c1.metric(t('trading_volume_24h'), f"${total_vol / 30:,.0f}", "+8.2%")
+    r1c1.metric(t('trading_volume_24h'), with_ci(total_vol / n_days, vol_ci / n_days), "+8.2%")
     r1c2.metric(t('dau'), f"{dau:,}", "+5.1%")
     r1c3.metric(t('mau'), f"{mau:,}", "+12.3%")
     r2c1, r2c2, r2c3 = st.columns(3)
-    r2c1.metric(t('retention_d1'), f"{avg_d1:.1f}%", "+1.8%")
-    r2c2.metric(t('fee_revenue'), f"${total_fees:,.0f}", "+15.4%")
+    r2c1.metric(t('retention_d1'), "—" if avg_d1 is None else f"{avg_d1:.1f}%", "+1.8%")
+    r2c2.metric(t('fee_revenue'), with_ci(total_fees, fee_ci), "+15.4%")
     r2c3.metric(t('avg_spread'), f"{avg_spread:.1f}", "-0.8")
 
     st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
@@ -1131,36 +1169,81 @@ def show_core_metrics(trades_df, users_df, filters):
 
     # ── Volume & Revenue ──
     with sub1:
-        _show_volume_revenue(tdf)
+        _show_volume_revenue(cube, filters)
 
     # ── User Growth ──
     with sub2:
-        _show_user_growth(udf, tdf)
+        _show_user_growth(udf, active, filters)
 
     # ── Acquisition Channels ──
     with sub3:
-        _show_acquisition_channels(udf, tdf)
+        _show_acquisition_channels(udf, cube, filters)
 
     # ── Retention ──
     with sub4:
-        _show_retention(ret_df)
+        if trade_cube.approximate:
+            st.info(t('exact_pending'))
+        else:
+            _show_retention()
 
     # ── Order Quality ──
     with sub5:
-        _show_order_quality(ob_df, filters)
+        _show_order_quality(filtered_ob, filters)
 
     # ── Real-Time Prices ──
     with sub6:
         _show_real_time_prices()
 
 
-def _show_volume_revenue(tdf):
+def _filter_core_data(trade_cube, users_df, filters):
+    """Cube, users and active-user index restricted to the sidebar filters.
+    User figures are as of the range end: everyone registered by then."""
+    start, end = filters['date_range']
+    cube = trade_cube.filter(coins=filters['coins'], channels=filters['channels'], regions=filters['regions'],
+                             start=start, end=end)
+    udf = load_category_index('users').select(users_df, date_range_rows(users_df['registration_date'], end=end),
+                                              channel=filters['channels'], region=filters['regions'])
+    return cube, udf, ActiveUserIndex(udf['last_active'])
+
+
+def _days_in_range(trade_cube, start, end):
+    """Days of start..end inside the loaded trade window, whatever the
+    filters leave; the divisor for daily averages."""
+    dates = trade_cube.cells['date']
+    if dates.empty:
+        return 1
+    first = max(pd.Timestamp(start), dates.iloc[0])
+    last = min(pd.Timestamp(end), dates.iloc[-1])
+    return max((last - first).days + 1, 1)
+
+
+def _filter_order_book(filters):
+    ob_df = load_order_book_data()
+    ob_rows = date_range_rows(ob_df['date'], *filters['date_range'])
+    return load_category_index('order_book').select(ob_df, ob_rows, coin=filters['coins'])
+
+
+def _volume_revenue_aggregates(cube):
+    # Sample cubes add *_ci columns, scaled along with their estimates
+    daily_coin_vol = cube.sum_by(['date', 'coin'], 'volume_usd')
+    daily_coin_vol[daily_coin_vol.columns[2:]] *= SCALE_FACTOR
+    daily_fees = cube.sum_by('date', 'fee')
+    daily_fees[daily_fees.columns[1:]] *= SCALE_FACTOR
+    coin_vol = cube.sum_by('coin', 'volume_usd')
+    # Coin x weekday straight from the cube's integer weekday column
+    weekday_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    heatmap_pivot = cube.sum_by(['coin', 'weekday'], 'volume_usd').set_index(['coin', 'weekday'])['volume_usd'].unstack('weekday')
+    heatmap_pivot = heatmap_pivot.reindex(columns=range(7)).set_axis(weekday_names, axis=1)
+    return daily_coin_vol, daily_fees, coin_vol, heatmap_pivot
+
+
+def _show_volume_revenue(cube, filters):
     """Volume & Revenue sub-tab."""
+    daily_coin_vol, daily_fees, coin_vol, heatmap_pivot = cached_result(
+        'volume_revenue', filters, lambda: _volume_revenue_aggregates(cube))
     col1, col2 = st.columns(2)
 
     # Daily volume by coin (stacked area)
-    daily_coin_vol = tdf.groupby(['date', 'coin'])['volume_usd'].sum().reset_index()
-    daily_coin_vol['volume_usd'] *= SCALE_FACTOR
     with col1:
         fig = px.area(daily_coin_vol, x='date', y='volume_usd', color='coin',
                       title=t('daily_volume_by_coin'),
@@ -1169,10 +1252,9 @@ def _show_volume_revenue(tdf):
         st.plotly_chart(fig, use_container_width=True)
 
     # Daily fee revenue
-    daily_fees = tdf.groupby('date')['fee'].sum().reset_index()
-    daily_fees['fee'] *= SCALE_FACTOR
     with col2:
         fig = px.bar(daily_fees, x='date', y='fee', title=t('fee_revenue_trend'),
+                     error_y='fee_ci' if 'fee_ci' in daily_fees else None,
                      color_discrete_sequence=['#00d4aa'])
         apply_dark_theme(fig)
         st.plotly_chart(fig, use_container_width=True)
@@ -1180,7 +1262,6 @@ def _show_volume_revenue(tdf):
     col3, col4 = st.columns(2)
 
     # Volume by coin (pie)
-    coin_vol = tdf.groupby('coin')['volume_usd'].sum().reset_index()
     with col3:
         fig = px.pie(coin_vol, values='volume_usd', names='coin',
                      title=t('volume_by_coin'),
@@ -1189,12 +1270,6 @@ def _show_volume_revenue(tdf):
         st.plotly_chart(fig, use_container_width=True)
 
     # Volume heatmap (coin x weekday)
-    tdf_copy = tdf.copy()
-    tdf_copy['weekday'] = tdf_copy['date'].dt.day_name()
-    weekday_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    heatmap_data = tdf_copy.groupby(['coin', 'weekday'])['volume_usd'].sum().reset_index()
-    heatmap_pivot = heatmap_data.pivot(index='coin', columns='weekday', values='volume_usd')
-    heatmap_pivot = heatmap_pivot.reindex(columns=weekday_order)
     with col4:
         fig = go.Figure(data=go.Heatmap(
             z=heatmap_pivot.values,
@@ -1210,11 +1285,12 @@ def _show_volume_revenue(tdf):
         st.plotly_chart(fig, use_container_width=True)
 
 
-def _show_user_growth(udf, tdf):
-    """User Growth sub-tab - active user trends, registration funnel."""
+def _show_user_growth(udf, active, filters):
+    """User Growth sub-tab - active user trends, registration funnel.
+    Trends end at the last day of the selected date range."""
     col1, col2 = st.columns(2)
 
-    now = datetime.now()
+    start, today = filters['date_range']
 
     with col1:
         # Period selector: Daily / Weekly / Monthly
@@ -1222,33 +1298,18 @@ def _show_user_growth(udf, tdf):
 
         if period == 'Daily':
             # DAU over 30 days
-            au_data = []
-            for i in range(30):
-                day = (now - timedelta(days=29 - i)).date()
-                count = udf[udf['last_active'].dt.date == day].shape[0] * SCALE_FACTOR
-                au_data.append({'date': day, 'Active Users': count})
-            au_df = pd.DataFrame(au_data)
-            label = t('dau')
+            ends = [today - timedelta(days=29 - i) for i in range(30)]
+            window, label = 1, t('dau')
         elif period == 'Weekly':
             # WAU over 12 weeks
-            au_data = []
-            for i in range(12):
-                week_end = (now - timedelta(weeks=11 - i)).date()
-                week_start = week_end - timedelta(days=6)
-                count = udf[(udf['last_active'].dt.date >= week_start) & (udf['last_active'].dt.date <= week_end)].drop_duplicates('user_id').shape[0] * SCALE_FACTOR
-                au_data.append({'date': week_end, 'Active Users': count})
-            au_df = pd.DataFrame(au_data)
-            label = t('wau')
+            ends = [today - timedelta(weeks=11 - i) for i in range(12)]
+            window, label = 7, t('wau')
         else:
             # MAU over 6 months
-            au_data = []
-            for i in range(6):
-                month_end = (now - timedelta(days=30 * (5 - i))).date()
-                month_start = month_end - timedelta(days=29)
-                count = udf[(udf['last_active'].dt.date >= month_start) & (udf['last_active'].dt.date <= month_end)].drop_duplicates('user_id').shape[0] * SCALE_FACTOR
-                au_data.append({'date': month_end, 'Active Users': count})
-            au_df = pd.DataFrame(au_data)
-            label = t('mau')
+            ends = [today - timedelta(days=30 * (5 - i)) for i in range(6)]
+            window, label = 30, t('mau')
+        au_df = cached_result('active_users', filters, lambda: pd.DataFrame(
+            {'date': ends, 'Active Users': active.window_counts(ends, window) * SCALE_FACTOR}), period)
 
         fig = go.Figure()
         fig.add_trace(go.Scatter(x=au_df['date'], y=au_df['Active Users'], name=label,
@@ -1258,10 +1319,14 @@ def _show_user_growth(udf, tdf):
         apply_dark_theme(fig)
         st.plotly_chart(fig, use_container_width=True)
 
-    # New registrations by channel (last 30 days)
-    recent_users = udf[udf['registration_date'] >= (now - timedelta(days=30))]
-    reg_by_channel = recent_users.groupby([recent_users['registration_date'].dt.date, 'channel']).size().reset_index(name='count')
-    reg_by_channel['count'] *= SCALE_FACTOR
+    def growth():
+        # New registrations by channel (selected date range)
+        recent_users = udf.iloc[date_range_rows(udf['registration_date'], start, today)]
+        reg_by_channel = recent_users.groupby([recent_users['registration_date'].dt.date, 'channel'], observed=True).size().reset_index(name='count')
+        reg_by_channel['count'] *= SCALE_FACTOR
+        return reg_by_channel
+    reg_by_channel = cached_result('user_growth', filters, growth)
+
     with col2:
         fig = px.bar(reg_by_channel, x='registration_date', y='count', color='channel',
                      title=t('new_users_by_channel'),
@@ -1269,16 +1334,18 @@ def _show_user_growth(udf, tdf):
         apply_dark_theme(fig)
         st.plotly_chart(fig, use_container_width=True)
 
-    # User funnel: Registered -> KYC Verified -> Traded -> Active (7d)
-    total_users = len(udf) * SCALE_FACTOR
-    kyc_verified = udf[udf['kyc_status'] == 'Verified'].shape[0] * SCALE_FACTOR
-    # Cap traders to fraction of registered users (realistic: ~30-40% of users trade)
-    traders = min(tdf['user_id'].nunique() * SCALE_FACTOR, int(total_users * 0.35))
-    active_7d = udf[udf['last_active'] >= (now - timedelta(days=7))].shape[0] * SCALE_FACTOR
+    # Funnel and VIP segments are per-user trade facts: no sample estimate
+    if filters['approximate']:
+        st.info(t('exact_pending'))
+        return
 
+    # User funnel: Registered -> KYC Verified -> Traded -> Active (7d),
+    # each stage counting users who also passed every earlier stage
+    funnel = cached_result('funnel', filters, lambda: _user_funnel(udf, filters))
+    stage_counts = funnel.counts() * SCALE_FACTOR
     fig = go.Figure(go.Funnel(
-        y=['Registered', 'KYC Verified', 'Traded (30d)', 'Active (7d)'],
-        x=[total_users, kyc_verified, traders, active_7d],
+        y=stage_counts.index,
+        x=stage_counts.to_numpy(),
         textinfo="value+percent initial",
         marker=dict(color=['#00d4aa', '#00b4d8', '#f0883e', '#e6edf3']),
     ))
@@ -1286,15 +1353,98 @@ def _show_user_growth(udf, tdf):
     apply_dark_theme(fig)
     st.plotly_chart(fig, use_container_width=True)
 
+    segment_by = st.radio(t('funnel_segment'), ['Channel', 'Region'], horizontal=True, key='funnel_segment')
+    seg_counts = funnel.by_segment(load_user_dimension().bitsets(segment_by.lower()))
+    seg_counts = seg_counts[seg_counts.iloc[:, 0] > 0]
+    seg_table = pd.DataFrame({segment_by: seg_counts.index})
+    for stage in seg_counts.columns:
+        seg_table[stage] = (seg_counts[stage] * SCALE_FACTOR).map("{:,.0f}".format).to_numpy()
+    seg_table['Conversion'] = (seg_counts.iloc[:, -1] / seg_counts.iloc[:, 0]).map("{:.1%}".format).to_numpy()
+    st.dataframe(seg_table, use_container_width=True, hide_index=True)
+
+    # VIP segments from the per-user feature store (lifetime, no raw trades)
+    st.markdown(f"### {t('vip_segments')}")
+    segments = cached_result('vip_segments', filters, lambda: _vip_segments(udf, load_user_features()))
+    st.dataframe(pd.DataFrame({
+        'VIP Level': segments.index.map("VIP {}".format),
+        'Users': segments['users'].map("{:,.0f}".format).to_numpy(),
+        'Traders': segments['traders'].map("{:,.0f}".format).to_numpy(),
+        'Trades / Trader': segments['trades_per_trader'].map("{:.1f}".format).to_numpy(),
+        'Volume (USD)': segments['volume_usd'].map("${:,.0f}".format).to_numpy(),
+        'Fees / User': segments['fees_per_user'].map("${:,.2f}".format).to_numpy(),
+        'Top Coin': segments['top_coin'].to_numpy(),
+    }), use_container_width=True, hide_index=True)
+
+
+def _user_funnel(udf, filters):
+    """Funnel stage bitsets over user keys for the filtered users and the
+    trades in the selected date range, coins, channels and regions."""
+    size = load_user_dimension().size
+    start, end = filters['date_range']
+    keys = user_keys(udf['user_id'])
+    trades_df = load_trades_data()
+    traded = load_category_index('trades').select(trades_df, date_range_rows(trades_df['date'], start, end),
+                                                  coin=filters['coins'], channel=filters['channels'],
+                                                  region=filters['regions'])
+    last_active = udf['last_active'].to_numpy()
+    active = (last_active >= np.datetime64(end - timedelta(days=6))) & (last_active < np.datetime64(end + timedelta(days=1)))
+    return Funnel({
+        'Registered': user_bitset(keys, size),
+        'KYC Verified': user_bitset(keys[(udf['kyc_status'] == 'Verified').to_numpy()], size),
+        'Traded (Period)': user_bitset(user_keys(traded['user_id']), size),
+        'Active (7d)': user_bitset(keys[active], size),
+    })
+
 
-def _show_acquisition_channels(udf, tdf):
+def _vip_segments(udf, features):
+    """Trading profile of the filtered users per VIP level."""
+    user_features = features.for_users(udf['user_id'])
+    user_features['vip_level'] = udf['vip_level'].to_numpy()
+    user_features['traded'] = user_features['trades'] > 0
+    seg = user_features.groupby('vip_level').agg(
+        users=('trades', 'size'), traders=('traded', 'sum'), trades=('trades', 'sum'),
+        volume_usd=('volume_usd', 'sum'), fees=('fees', 'sum'),
+    )
+    seg['trades_per_trader'] = seg['trades'] / seg['traders'].where(seg['traders'] > 0)
+    seg['fees_per_user'] = seg['fees'] / seg['users']
+    seg['top_coin'] = (user_features[user_features['traded']].groupby('vip_level')['favorite_coin']
+                       .agg(lambda s: s.mode().iloc[0] if len(s) else "—").reindex(seg.index, fill_value="—"))
+    seg[['users', 'traders', 'volume_usd']] *= SCALE_FACTOR
+    return seg
+
+
+def _channel_performance(cube, users_by_channel, filters, traders_mode):
+    """Users, traders, volume, fees and conversion for every channel.
+    A sample cube has no distinct traders, so those stay NaN."""
+    if cube.approximate:
+        traders = pd.Series(np.nan, index=CHANNELS)
+    elif traders_mode == 'Exact':
+        trades_df = load_trades_data()
+        rows = date_range_rows(trades_df['date'], *filters['date_range'])
+        tdf = load_category_index('trades').select(trades_df, rows, coin=filters['coins'], channel=filters['channels'],
+                                                   region=filters['regions'])
+        traders = tdf.groupby('channel', observed=True)['user_id'].nunique()
+    else:
+        traders = cube.distinct_users(by='channel')
+    perf = cube.sum_by('channel', ['volume_usd', 'fee']).set_index('channel').reindex(CHANNELS, fill_value=0)
+    perf = perf.drop(columns=['volume_usd_ci', 'fee_ci'], errors='ignore')
+    perf['users'] = users_by_channel
+    perf['traders'] = traders.reindex(CHANNELS, fill_value=0)
+    perf *= SCALE_FACTOR
+    perf['conversion'] = perf['traders'] / perf['users'].where(perf['users'] > 0)
+    if not cube.approximate:
+        perf['conversion'] = perf['conversion'].fillna(0)
+    return perf
+
+
+def _show_acquisition_channels(udf, cube, filters):
     """Acquisition Channels sub-tab - channel ops dashboard."""
     col1, col2 = st.columns(2)
 
     # Users by channel
-    channel_users = udf['channel'].value_counts().reset_index()
-    channel_users.columns = ['channel', 'users']
-    channel_users['users'] *= SCALE_FACTOR
+    users_by_channel = cached_result('channel_users', filters,
+                                     lambda: udf['channel'].value_counts().reindex(CHANNELS, fill_value=0))
+    channel_users = pd.DataFrame({'channel': CHANNELS, 'users': users_by_channel.to_numpy() * SCALE_FACTOR})
     with col1:
         fig = px.bar(channel_users, x='users', y='channel', orientation='h',
                      title=t('users_by_channel'),
@@ -1315,38 +1465,46 @@ def _show_acquisition_channels(udf, tdf):
         apply_dark_theme(fig)
         st.plotly_chart(fig, use_container_width=True)
 
-    # Channel performance table
+    # Channel performance table: one grouped result for all channels
     st.markdown(f"### {t('channel_performance')}")
-    perf_rows = []
-    for ch in CHANNELS:
-        ch_users = udf[udf['channel'] == ch]
-        ch_trades = tdf[tdf['channel'] == ch]
-        n_users = len(ch_users) * SCALE_FACTOR
-        n_traders = ch_trades['user_id'].nunique() * SCALE_FACTOR
-        vol = ch_trades['volume_usd'].sum() * SCALE_FACTOR
-        fees = ch_trades['fee'].sum() * SCALE_FACTOR
-        cac = CHANNEL_CAC[ch]
-        conv = n_traders / n_users if n_users > 0 else 0
-        perf_rows.append({
-            'Channel': ch, 'Users': f"{n_users:,}", 'Traders': f"{n_traders:,}",
-            'Volume (USD)': f"${vol:,.0f}", 'Fee Revenue': f"${fees:,.0f}",
-            'CAC ($)': f"${cac:.0f}" if cac > 0 else "Free",
-            'Conversion': f"{conv:.1%}",
-        })
-    st.dataframe(pd.DataFrame(perf_rows), use_container_width=True, hide_index=True)
-
-
-def _show_retention(ret_df):
-    """Retention sub-tab."""
+    traders_mode = st.radio(t('traders_mode'), ['Exact', 'HyperLogLog'], horizontal=True, key='traders_mode')
+    perf = cached_result('channel_performance', filters,
+                         lambda: _channel_performance(cube, users_by_channel, filters, traders_mode), traders_mode)
+
+    # HLL counts carry a relative standard error, shown next to each value
+    traders_fmt = "{:,.0f}" if traders_mode == 'Exact' else "{:,.0f} ±" + f"{HLL_RELATIVE_ERROR:.1%}"
+    cac = pd.Series(CHANNEL_CAC).reindex(CHANNELS)
+    st.dataframe(pd.DataFrame({
+        'Channel': CHANNELS,
+        'Users': perf['users'].map("{:,.0f}".format).to_numpy(),
+        'Traders': perf['traders'].map(lambda x: "—" if np.isnan(x) else traders_fmt.format(x)).to_numpy(),
+        'Volume (USD)': perf['volume_usd'].map("${:,.0f}".format).to_numpy(),
+        'Fee Revenue': perf['fee'].map("${:,.0f}".format).to_numpy(),
+        'CAC ($)': cac.map(lambda c: f"${c:.0f}" if c > 0 else "Free").to_numpy(),
+        'Conversion': perf['conversion'].map(lambda x: "—" if np.isnan(x) else f"{x:.1%}").to_numpy(),
+    }), use_container_width=True, hide_index=True)
+
+
+def _show_retention():
+    """Retention sub-tab - cohorts computed from registrations and trade activity."""
+    c1, c2, c3 = st.columns([1, 1, 2])
+    freq = c1.radio(t('cohort_period'), ['Monthly', 'Weekly'], horizontal=True, key='cohort_freq')
+    kind = c2.radio(t('retention_kind'), ['Exact Day', 'Unbounded'], horizontal=True, key='retention_kind')
+    offsets = c3.multiselect(t('retention_days'), RETENTION_OFFSETS, default=[1, 7, 14, 30],
+                             format_func=lambda d: f"D{d}", key='retention_days')
+    offsets = sorted(offsets) or [1, 7, 14, 30]
+    unbounded = kind == 'Unbounded'
+
+    engine = load_retention_engine('M' if freq == 'Monthly' else 'W')
+    n_cohorts = 6 if freq == 'Monthly' else 12
+    ret = engine.retention(offsets, unbounded).iloc[-n_cohorts:] * 100
+    cohorts = ret.index.strftime('%Y-%m' if freq == 'Monthly' else '%Y-%m-%d')
+    day_labels = [f"D{d}" for d in offsets]
     col1, col2 = st.columns(2)
 
-    # Retention curve (average across cohorts)
-    avg_retention = ret_df[['d1', 'd7', 'd14', 'd30']].mean()
-    curve_df = pd.DataFrame({
-        'Day': ['D0', 'D1', 'D7', 'D14', 'D30'],
-        'Retention %': [100, avg_retention['d1'] * 100, avg_retention['d7'] * 100,
-                        avg_retention['d14'] * 100, avg_retention['d30'] * 100]
-    })
+    # Retention curve (pooled over every cohort, day by day)
+    curve = engine.overall(range(max(offsets) + 1), unbounded) * 100
+    curve_df = pd.DataFrame({'Day': curve.index, 'Retention %': curve.to_numpy()})
     with col1:
         fig = px.line(curve_df, x='Day', y='Retention %', markers=True,
                       title=t('retention_curve'),
@@ -1355,13 +1513,13 @@ def _show_retention(ret_df):
         fig.update_layout(yaxis_range=[0, 105])
         st.plotly_chart(fig, use_container_width=True)
 
-    # Cohort heatmap
-    heatmap_vals = ret_df[['d1', 'd7', 'd14', 'd30']].values * 100
+    # Cohort heatmap (blank where a cohort has not reached that day yet)
+    heatmap_vals = ret.to_numpy()
     with col2:
         fig = go.Figure(data=go.Heatmap(
             z=heatmap_vals,
-            x=['D1', 'D7', 'D14', 'D30'],
-            y=ret_df['cohort'].values,
+            x=day_labels,
+            y=cohorts,
             colorscale='YlGn',
             text=np.round(heatmap_vals, 1),
             texttemplate="%{text}%",
@@ -1372,22 +1530,26 @@ def _show_retention(ret_df):
         st.plotly_chart(fig, use_container_width=True)
 
     # Cohort table
-    display_df = ret_df.copy()
-    display_df['cohort_size'] = display_df['cohort_size'].apply(lambda x: f"{x * SCALE_FACTOR:,}")
-    for col in ['d1', 'd7', 'd14', 'd30']:
-        display_df[col] = display_df[col].apply(lambda x: f"{x * 100:.1f}%")
-    display_df.columns = ['Cohort', 'Size', 'D1', 'D7', 'D14', 'D30']
+    display_df = pd.DataFrame({'Cohort': cohorts, 'Size': [f"{x * SCALE_FACTOR:,}" for x in engine.sizes[-n_cohorts:]]})
+    for d, label in zip(offsets, day_labels):
+        display_df[label] = ret[d].map(lambda x: "—" if np.isnan(x) else f"{x:.1f}%").to_numpy()
     st.dataframe(display_df, use_container_width=True, hide_index=True)
 
 
-def _show_order_quality(ob_df, filters):
-    """Order Quality sub-tab - execution metrics."""
-    filtered_ob = ob_df[ob_df['coin'].isin(filters['coins'])]
+def _order_quality_aggregates(filtered_ob):
+    exec_trend = filtered_ob.groupby('date')['avg_exec_time_ms'].mean().reset_index()
+    spread_by_coin = filtered_ob.groupby('coin')['avg_spread_bps'].mean().reset_index().sort_values('avg_spread_bps')
+    fill_by_coin = filtered_ob.groupby('coin')['fill_rate'].mean().reset_index().sort_values('fill_rate', ascending=False)
+    return exec_trend, spread_by_coin, fill_by_coin
+
 
+def _show_order_quality(filtered_ob, filters):
+    """Order Quality sub-tab - execution metrics for the filtered order book."""
+    exec_trend, spread_by_coin, fill_by_coin = cached_result(
+        'order_quality', filters, lambda: _order_quality_aggregates(filtered_ob))
     col1, col2 = st.columns(2)
 
     # Avg execution time trend
-    exec_trend = filtered_ob.groupby('date')['avg_exec_time_ms'].mean().reset_index()
     with col1:
         fig = px.line(exec_trend, x='date', y='avg_exec_time_ms',
                       title=t('exec_time_trend'),
@@ -1396,7 +1558,6 @@ def _show_order_quality(ob_df, filters):
         st.plotly_chart(fig, use_container_width=True)
 
     # Avg spread by coin
-    spread_by_coin = filtered_ob.groupby('coin')['avg_spread_bps'].mean().reset_index().sort_values('avg_spread_bps')
     with col2:
         fig = px.bar(spread_by_coin, x='coin', y='avg_spread_bps',
                      title=t('spread_by_coin'),
@@ -1406,7 +1567,6 @@ def _show_order_quality(ob_df, filters):
         st.plotly_chart(fig, use_container_width=True)
 
     # Fill rate by coin
-    fill_by_coin = filtered_ob.groupby('coin')['fill_rate'].mean().reset_index().sort_values('fill_rate', ascending=False)
     fig = px.bar(fill_by_coin, x='coin', y='fill_rate',
                  title=t('fill_rate'),
                  color_discrete_sequence=['#00d4aa'])
@@ -1601,10 +1761,22 @@ def show_news_sentiment(filters):
         st.warning("scikit-learn not installed. Install with: pip install scikit-learn")
         return
 
-    n_topics = st.slider(t('num_topics'), min_value=3, max_value=10, value=5, key="n_topics")
+    n_topics = st.slider(t('num_topics'), min_value=min(TOPIC_COUNTS), max_value=max(TOPIC_COUNTS), value=5,
+                         key="n_topics")
 
-    texts = sentiment_df['title'].tolist()
-    topics, doc_topics = run_topic_modeling(tuple(texts), n_topics=n_topics)
+    # Every slider value is fitted in the background; show the closest
+    # finished model and refresh until the selected one is ready
+    texts = tuple(sentiment_df['title'].tolist())
+    warmer = get_topic_warmer()
+    ready = warmer.nearest_ready(texts, n_topics)
+    if ready is None:
+        topics, doc_topics = warmer.result(texts, n_topics)
+    else:
+        shown, (topics, doc_topics) = ready
+        if shown != n_topics:
+            st.caption(t('topics_pending').format(n_topics, shown))
+            if AUTOREFRESH_AVAILABLE:
+                st_autorefresh(interval=1000, limit=None, key="topics_refresh")
 
     if not topics:
         st.info("Not enough text data for topic modeling (need 10+ documents).")
@@ -1649,7 +1821,7 @@ def show_news_sentiment(filters):
 # CEX relevance: "actionable insights", "deep-dive analyses"
 # ══════════════════════════════════════════════════════════════════════════════
 
-def show_bi_agent(trades_df, users_df):
+def show_bi_agent(users_df):
     """Render BI Agent tab with chat interface."""
     st.markdown(f"### {t('bi_agent_title')}")
     st.markdown(f"*{t('bi_agent_desc')}*")
@@ -1714,7 +1886,7 @@ def show_bi_agent(trades_df, users_df):
         # Get LLM response
         with st.chat_message("assistant"):
             with st.spinner("Analyzing exchange data..."):
-                context = build_data_context(trades_df, users_df)
+                context = build_data_context(load_trades_data(days=30), users_df)
                 response, success = query_deepseek(user_input, context, api_key)
 
             st.markdown(response)
@@ -1743,11 +1915,13 @@ def main():
     st.markdown('<div class="main-header">Web3 BI Dashboard</div>', unsafe_allow_html=True)
     st.markdown('<div class="sub-header">CEX Growth Insights | Data Analytics Platform</div>', unsafe_allow_html=True)
 
+    # Roll cached datasets over on a new day before anything is loaded
+    st.session_state.dataset_day = dataset_end_date().date()
+
     # Sidebar
     filters = show_sidebar()
 
-    # Load data
-    trades_df = load_trades_data(days=30)
+    # Load data (trade data is loaded by the tabs that need it)
     users_df = load_users_data()
 
     # Main tabs
@@ -1758,19 +1932,22 @@ def main():
     ])
 
     with tab1:
-        show_core_metrics(trades_df, users_df, filters)
+        show_core_metrics(users_df, filters)
 
     with tab2:
         show_news_sentiment(filters)
 
     with tab3:
-        show_bi_agent(trades_df, users_df)
+        show_bi_agent(users_df)
 
     # Footer
     st.markdown("---")
     fc1, fc2, fc3 = st.columns(3)
     with fc1:
         st.caption(f"{t('data_source')}: Demo Data + CoinGecko API")
+        cache = get_result_cache().stats()
+        st.caption(f"{t('result_cache')}: {cache['hits']:,} hits / {cache['misses']:,} misses · "
+                   f"{cache['bytes'] / 1024 ** 2:.1f} MiB")
     with fc2:
         st.caption(f"{t('last_updated')}: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     with fc3:
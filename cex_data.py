@@ -0,0 +1,549 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# CEX Data Layer - synthetic exchange datasets for the Web3 BI Dashboard
+# Kept free of Streamlit so process-pool workers can import it directly
+# ══════════════════════════════════════════════════════════════════════════════
+
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pads
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CONSTANTS
+# ══════════════════════════════════════════════════════════════════════════════
+
+COINS = ["BTC", "ETH", "SOL", "BNB", "XRP", "ADA", "DOGE", "AVAX", "DOT", "MATIC"]
+COIN_WEIGHTS = [0.30, 0.25, 0.10, 0.08, 0.06, 0.05, 0.05, 0.04, 0.04, 0.03]
+COIN_AVG_TRADE = {"BTC": 5000, "ETH": 2000, "SOL": 800, "BNB": 1000, "XRP": 500,
+                  "ADA": 300, "DOGE": 200, "AVAX": 600, "DOT": 400, "MATIC": 250}
+CHANNELS = ["Organic", "KOL Referral", "Paid Ads", "Social Media", "Airdrop Campaign"]
+CHANNEL_WEIGHTS = [0.35, 0.20, 0.20, 0.15, 0.10]
+REGIONS = ["Asia", "Europe", "North America", "South America", "Africa", "Oceania"]
+REGION_WEIGHTS = [0.45, 0.25, 0.15, 0.08, 0.04, 0.03]
+UNKNOWN_REGION = "Unknown"  # Region of trades whose user is not in the users table
+KYC_STATUSES = ["Verified", "Pending", "Not Started"]
+KYC_WEIGHTS = [0.60, 0.25, 0.15]
+VIP_WEIGHTS = [0.70, 0.15, 0.08, 0.04, 0.02, 0.01]  # VIP levels 0-5
+TRADE_TYPES = ["spot", "futures"]
+TRADE_TYPE_WEIGHTS = [0.70, 0.30]
+TRADES_PER_DAY = 4000  # Weekday baseline before SCALE_FACTOR
+
+# Independent random streams per dataset. Every partition (one day of trades
+# or order-book metrics, one range of users) gets its own Generator seeded
+# from (seed, stream, partition key), so output is identical for any number
+# of workers and a given day always regenerates the same rows.
+STREAM_TRADES, STREAM_ORDER_BOOK, STREAM_USERS, STREAM_TRADE_SAMPLES = range(4)
+USER_PARTITION_SIZE = 250_000
+
+# Compact schema (opt-in): integer user keys, fixed-category dimensions,
+# float32 money columns and an int32 day number (days since 1970-01-01)
+COIN_DTYPE = pd.CategoricalDtype(COINS)
+CHANNEL_DTYPE = pd.CategoricalDtype(CHANNELS)
+REGION_DTYPE = pd.CategoricalDtype(REGIONS)
+KYC_DTYPE = pd.CategoricalDtype(KYC_STATUSES)
+TRADE_TYPE_DTYPE = pd.CategoricalDtype(TRADE_TYPES)
+
+
+def partition_rng(seed, stream, key):
+    """Generator for one partition. Same as the child SeedSequence that
+    SeedSequence(seed).spawn() would hand out at spawn_key (stream, key)."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(stream, key)))
+
+
+def process_pool(workers):
+    """Process pool for map_partitions that callers keep and reuse."""
+    # spawn: forking Streamlit's threaded server process is not safe
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def map_partitions(fn, tasks, workers=1, pool=None):
+    """Apply fn to each task, yielding results in task order.
+    With workers > 1 tasks run in a process pool of at most one worker per
+    task, so a single partition (a daily rollover) never starts a pool; at
+    most 2 x workers results are in flight so streaming callers keep
+    bounded memory. A long-lived pool may be passed in; otherwise one is
+    started for this call and shut down when it returns."""
+    tasks = list(tasks)
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        yield from map(fn, tasks)
+        return
+    if pool is None:
+        with process_pool(workers) as pool:
+            yield from map_partitions(fn, tasks, workers, pool)
+        return
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(fn, task))
+        if len(pending) >= 2 * workers:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _day_start(date=None):
+    """Midnight of the given date (default: today)."""
+    return (date or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+@lru_cache(maxsize=4)
+def _user_id_labels(n):
+    """Lookup table of "U00042"-style user IDs, so IDs are gathered by index
+    instead of formatted one f-string per row."""
+    return np.array([f"U{i:05d}" for i in range(n)], dtype=object)
+
+
+def _format_user_ids(keys):
+    """Vectorized "U00042"-style labels for an array of integer user keys."""
+    return np.char.add('U', np.char.zfill(keys.astype(str), 5)).astype(object)
+
+
+def user_keys(user_ids):
+    """Integer keys for user IDs: compact integer keys pass through, "U00042"
+    labels are parsed once per distinct label."""
+    ids = np.asarray(user_ids)
+    if ids.dtype.kind in 'iu':
+        return ids.astype(np.int64)
+    codes, labels = pd.factorize(ids)
+    return pd.Index(labels).str.slice(1).astype(np.int64).to_numpy()[codes]
+
+
+def _trade_day_partition(task):
+    """Generate one day of trades as a DataFrame built from column arrays."""
+    seed, date, trades_per_day, compact = task
+    rng = partition_rng(seed, STREAM_TRADES, date.toordinal())
+
+    # Weekends run at 70% of weekday activity, +/-15% noise
+    weekend_factor = 0.7 if date.weekday() >= 5 else 1.0
+    n = int(trades_per_day * weekend_factor * rng.uniform(0.85, 1.15))
+
+    coin_idx = rng.choice(len(COINS), size=n, p=COIN_WEIGHTS)
+    channel_idx = rng.choice(len(CHANNELS), size=n, p=CHANNEL_WEIGHTS)
+    trade_type_idx = rng.choice(len(TRADE_TYPES), size=n, p=TRADE_TYPE_WEIGHTS)
+
+    avg_trade = np.array([COIN_AVG_TRADE[c] for c in COINS], dtype=np.float64)
+    volume = np.maximum(10, avg_trade[coin_idx] * rng.lognormal(0, 0.8, size=n))
+    fee_rate = rng.uniform(0.0008, 0.0012, size=n)
+    keys = rng.integers(1, 100000, size=n)
+
+    if compact:
+        return pd.DataFrame({
+            'date': np.full(n, np.datetime64(date, 'ns')),
+            'day': np.full(n, np.datetime64(date, 'D').astype(np.int32)),
+            'user_id': keys.astype(np.int32),
+            'coin': pd.Categorical.from_codes(coin_idx, dtype=COIN_DTYPE),
+            'volume_usd': np.round(volume, 2).astype(np.float32),
+            'fee': np.round(volume * fee_rate, 2).astype(np.float32),
+            'channel': pd.Categorical.from_codes(channel_idx, dtype=CHANNEL_DTYPE),
+            'trade_type': pd.Categorical.from_codes(trade_type_idx, dtype=TRADE_TYPE_DTYPE),
+        })
+    return pd.DataFrame({
+        'date': np.full(n, np.datetime64(date, 'ns')),
+        'user_id': _user_id_labels(100000)[keys],
+        'coin': np.array(COINS, dtype=object)[coin_idx],
+        'volume_usd': np.round(volume, 2),
+        'fee': np.round(volume * fee_rate, 2),
+        'channel': np.array(CHANNELS, dtype=object)[channel_idx],
+        'trade_type': np.array(TRADE_TYPES, dtype=object)[trade_type_idx],
+    })
+
+
+def _trade_sample_day_partition(task):
+    """Stratified sample of one generated day of trades."""
+    seed, date, trades_per_day, compact, fraction = task
+    day_df = _trade_day_partition((seed, date, trades_per_day, compact))
+    return stratified_sample(day_df, fraction, partition_rng(seed, STREAM_TRADE_SAMPLES, date.toordinal()))
+
+
+def _order_book_day_partition(task):
+    """Order book quality metrics for every coin on one day."""
+    seed, date = task
+    rng = partition_rng(seed, STREAM_ORDER_BOOK, date.toordinal())
+    base_spread = np.array([{"BTC": 3, "ETH": 4, "SOL": 8, "BNB": 6}.get(c, 10) for c in COINS])
+    n = len(COINS)
+    return pd.DataFrame({
+        'date': np.full(n, np.datetime64(date, 'ns')),
+        'coin': COINS,
+        'avg_spread_bps': np.round(base_spread * rng.uniform(0.8, 1.3, size=n), 1),
+        'avg_exec_time_ms': np.round(rng.uniform(50, 180, size=n), 0),
+        'fill_rate': np.round(rng.uniform(0.95, 0.995, size=n), 3),
+    })
+
+
+def _users_partition(task):
+    """Users with IDs start+1 .. stop, registered relative to end_date.
+    Dates are built as datetime64 arrays from whole-day offsets."""
+    seed, start, stop, end_date, compact = task
+    rng = partition_rng(seed, STREAM_USERS, start // USER_PARTITION_SIZE)
+    n_users = stop - start
+    now = np.datetime64(end_date, 'us')
+
+    # Registered ~Exp(60) days ago, last active ~Exp(15) days after that,
+    # never later than now
+    reg_offsets = rng.exponential(60, size=n_users).astype(np.int64)
+    active_offsets = np.minimum(rng.exponential(15, size=n_users).astype(np.int64), reg_offsets)
+    reg_dates = now - reg_offsets.astype('timedelta64[D]')
+    last_actives = np.minimum(reg_dates + active_offsets.astype('timedelta64[D]'), now)
+
+    regions = rng.choice(len(REGIONS), size=n_users, p=REGION_WEIGHTS)
+    channels = rng.choice(len(CHANNELS), size=n_users, p=CHANNEL_WEIGHTS)
+    kyc = rng.choice(len(KYC_STATUSES), size=n_users, p=KYC_WEIGHTS)
+    vip = rng.choice(len(VIP_WEIGHTS), size=n_users, p=VIP_WEIGHTS)
+
+    if compact:
+        return pd.DataFrame({
+            'user_id': np.arange(start + 1, stop + 1, dtype=np.int32),
+            'registration_date': reg_dates,
+            'last_active': last_actives,
+            'region': pd.Categorical.from_codes(regions, dtype=REGION_DTYPE),
+            'channel': pd.Categorical.from_codes(channels, dtype=CHANNEL_DTYPE),
+            'kyc_status': pd.Categorical.from_codes(kyc, dtype=KYC_DTYPE),
+            'vip_level': vip.astype(np.int8),
+        })
+    return pd.DataFrame({
+        'user_id': _format_user_ids(np.arange(start + 1, stop + 1)),
+        'registration_date': reg_dates,
+        'last_active': last_actives,
+        'region': np.array(REGIONS, dtype=object)[regions],
+        'channel': np.array(CHANNELS, dtype=object)[channels],
+        'kyc_status': np.array(KYC_STATUSES, dtype=object)[kyc],
+        'vip_level': vip,
+    })
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CEX DATA GENERATOR
+# Generates realistic CEX trading data for dashboard demo
+# Supports daily data extraction and dashboard KPIs per job description
+# ══════════════════════════════════════════════════════════════════════════════
+
+class CEXDataGenerator:
+    """Generate realistic centralized exchange data for CEX analytics.
+    workers > 1 spreads day and user partitions across a process pool;
+    results are bit-for-bit identical to the sequential run.
+    compact=True emits the compact schema for trades and users: integer
+    user_id keys, category dimensions, float32 volume/fee and a day column."""
+
+    def __init__(self, seed=42, workers=1, compact=False):
+        self.seed = seed
+        self.workers = workers
+        self.compact = compact
+
+    def generate_trades_df(self, days=30, trades_per_day=TRADES_PER_DAY, end_date=None):
+        """Generate trade records. ~4000 trades/day, scaled x10 for display.
+        CEX relevance: daily data extraction, trading volume analysis.
+        Columns are drawn as whole arrays (no per-trade Python loop), so
+        tens of millions of rows build in seconds."""
+        batches = self.iter_trade_batches(days, trades_per_day=trades_per_day, end_date=end_date)
+        return pd.concat(batches, ignore_index=True)
+
+    def iter_trade_batches(self, days=30, batch_rows=None, as_arrow=False, trades_per_day=TRADES_PER_DAY,
+                           end_date=None):
+        """Stream trades one day at a time, oldest day first.
+        With batch_rows, each day is further split into chunks of at most
+        that many rows (batches never span two days). Yields DataFrames, or
+        pyarrow RecordBatches when as_arrow=True, so writers and rollups can
+        consume multi-year datasets in bounded memory."""
+        if as_arrow and not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow not installed. Run: pip install pyarrow")
+        dates = pd.date_range(end=_day_start(end_date), periods=days, freq='D')
+        for day_df in self.iter_trade_days(dates, trades_per_day):
+            step = batch_rows or max(len(day_df), 1)
+            for start in range(0, len(day_df), step):
+                batch = day_df.iloc[start:start + step]
+                yield pa.RecordBatch.from_pandas(batch, preserve_index=False) if as_arrow else batch
+
+    def iter_trade_days(self, dates, trades_per_day=TRADES_PER_DAY):
+        """One trade frame per requested date, in the given order. A date
+        always yields the same rows, whatever window it is generated in."""
+        tasks = [(self.seed, pd.Timestamp(date), trades_per_day, self.compact) for date in dates]
+        return map_partitions(_trade_day_partition, tasks, self.workers)
+
+    def iter_trade_sample_days(self, dates, fraction, trades_per_day=TRADES_PER_DAY):
+        """stratified_sample() of each requested day, drawn where the day is
+        generated so only the sample leaves a pool worker."""
+        tasks = [(self.seed, pd.Timestamp(date), trades_per_day, self.compact, fraction) for date in dates]
+        return map_partitions(_trade_sample_day_partition, tasks, self.workers)
+
+    def generate_users_df(self, n_users=10000, end_date=None):
+        """Generate user registration data.
+        CEX relevance: user growth metrics, DAU/WAU/MAU, acquisition cost analysis."""
+        end_date = end_date or datetime.now()
+        tasks = [(self.seed, start, min(start + USER_PARTITION_SIZE, n_users), end_date, self.compact)
+                 for start in range(0, n_users, USER_PARTITION_SIZE)]
+        return pd.concat(map_partitions(_users_partition, tasks, self.workers), ignore_index=True)
+
+    def generate_order_book_metrics(self, days=30, end_date=None):
+        """Generate order book quality metrics per coin per day.
+        CEX relevance: liquidity monitoring, execution quality dashboard."""
+        dates = pd.date_range(end=_day_start(end_date), periods=days, freq='D')
+        return pd.concat(self.iter_order_book_days(dates), ignore_index=True)
+
+    def iter_order_book_days(self, dates):
+        """One frame of order book metrics per requested date."""
+        tasks = [(self.seed, pd.Timestamp(date)) for date in dates]
+        return map_partitions(_order_book_day_partition, tasks, self.workers)
+
+    def generate_news_corpus(self, n=150):
+        """Generate realistic crypto news headlines as fallback.
+        CEX relevance: sentiment analysis, market intelligence."""
+        templates_positive = [
+            "{coin} surges {pct}% as institutional adoption accelerates",
+            "Exchange reports record {coin} trading volume amid market rally",
+            "{coin} breaks key resistance level, analysts predict further gains",
+            "Major bank announces {coin} custody service, boosting market confidence",
+            "{coin} ecosystem sees explosive DeFi growth, TVL hits new ATH",
+            "Regulatory clarity for {coin} drives positive market sentiment",
+            "{coin} network upgrade completed successfully, transaction fees drop 40%",
+            "Exchange launches {coin} staking program with competitive APY",
+            "Whale accumulation of {coin} signals long-term bullish outlook",
+            "{coin} partnership with Fortune 500 company announced",
+        ]
+        templates_negative = [
+            "{coin} drops {pct}% amid broader market sell-off concerns",
+            "Security vulnerability found in {coin} protocol raises concerns",
+            "Regulatory crackdown threatens {coin} adoption in key markets",
+            "{coin} faces network congestion issues, users report delays",
+            "Large {coin} holder liquidated, triggering cascade of sell orders",
+            "FUD spreads as {coin} faces potential delisting from exchanges",
+            "{coin} development team faces internal disputes, roadmap delayed",
+            "Market analysts warn of potential {coin} bear cycle ahead",
+        ]
+        templates_neutral = [
+            "{coin} consolidates near ${price} level as traders await catalyst",
+            "Exchange adds new {coin} trading pairs for Asian markets",
+            "{coin} trading volume remains steady at ${vol}M daily average",
+            "Analysis: What {coin} on-chain data reveals about market direction",
+            "Exchange implements enhanced KYC for {coin} derivatives trading",
+            "{coin} hash rate reaches new milestone, network security strengthens",
+            "Weekly recap: {coin} price action and key technical levels",
+            "Industry report: {coin} market share among top exchanges analyzed",
+        ]
+        sources = ["CoinDesk", "CoinTelegraph", "The Block", "Decrypt", "Bloomberg Crypto",
+                    "Reuters Digital", "Exchange Research", "Messari", "Glassnode", "CryptoSlate"]
+
+        rng = np.random.default_rng(self.seed)  # Local stream: leaves the global NumPy state alone
+        news = []
+        for i in range(n):
+            coin = rng.choice(COINS)
+            pct = rng.integers(2, 25)
+            price = rng.integers(100, 70000)
+            vol = rng.integers(50, 500)
+            sentiment_type = rng.choice(["positive", "negative", "neutral"], p=[0.4, 0.25, 0.35])
+
+            if sentiment_type == "positive":
+                template = rng.choice(templates_positive)
+            elif sentiment_type == "negative":
+                template = rng.choice(templates_negative)
+            else:
+                template = rng.choice(templates_neutral)
+
+            title = template.format(coin=coin, pct=pct, price=price, vol=vol)
+            pub_date = datetime.now() - timedelta(hours=int(rng.integers(1, 72 * 5)))
+
+            news.append({
+                'title': title,
+                'description': f"Detailed analysis of {coin} market dynamics and trading patterns on the exchange.",
+                'published_at': pub_date.isoformat(),
+                'source': {'title': rng.choice(sources)},
+                'currencies': [{'code': coin}],
+            })
+
+        return sorted(news, key=lambda x: x['published_at'], reverse=True)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# STRATIFIED TRADE SAMPLES
+# ══════════════════════════════════════════════════════════════════════════════
+
+SAMPLE_KEYS = ['date', 'coin']
+SAMPLE_MIN_ROWS = 30  # Per stratum, so small coins still get a usable variance
+
+
+def stratified_sample(trades_df, fraction, rng, min_rows=SAMPLE_MIN_ROWS):
+    """Simple random sample without replacement inside every date x coin
+    stratum: ceil(fraction x N) trades, at least min_rows, or the whole
+    stratum when it is smaller. Sampled rows keep their original order and
+    carry stratum_rows (N) and stratum_sample (n) for weighting."""
+    codes = trades_df.groupby(SAMPLE_KEYS, observed=True, sort=False).ngroup().to_numpy()
+    sizes = np.bincount(codes)
+    quotas = np.minimum(sizes, np.maximum(np.ceil(fraction * sizes).astype(np.int64), min_rows))
+    # Random order inside each stratum, then keep the first quota rows
+    order = np.lexsort((rng.random(len(codes)), codes))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    ranks = np.arange(len(order)) - starts[codes[order]]
+    rows = np.sort(order[ranks < quotas[codes[order]]])
+    sample = trades_df.iloc[rows].reset_index(drop=True)
+    sample['stratum_rows'] = sizes[codes[rows]].astype(np.int32)
+    sample['stratum_sample'] = quotas[codes[rows]].astype(np.int32)
+    return sample
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# ON-DISK DATASET STORE
+# Generated frames persisted as Arrow IPC files and memory-mapped on load,
+# so a restart or cache expiry costs a file open instead of a regeneration
+# ══════════════════════════════════════════════════════════════════════════════
+
+DATASET_SCHEMA_VERSION = 1  # Bump when generated columns or distributions change
+DATASET_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".dataset_cache")
+
+
+class DatasetStore:
+    """Read-mostly file cache of generated datasets.
+    Files are keyed by dataset name plus a hash of the generator parameters
+    and DATASET_SCHEMA_VERSION. Writes go to a temp file and are renamed into
+    place, so several server processes can share one directory. Files are
+    mapped read-only; a frame read from one file keeps its numeric columns
+    backed by the page cache, while day windows are copied on load.
+    Without pyarrow the store is a pass-through and every load regenerates."""
+
+    def __init__(self, root=DATASET_CACHE_DIR, max_age_days=7):
+        self.root = root
+        self.max_age_days = max_age_days
+
+    def path_for(self, name, params):
+        key = json.dumps(dict(params, schema=DATASET_SCHEMA_VERSION), sort_keys=True, default=str)
+        return os.path.join(self.root, f"{name}-{hashlib.sha1(key.encode()).hexdigest()[:16]}.arrow")
+
+    def load_or_build(self, name, params, build):
+        """Return the stored frame for (name, params), building it on a miss."""
+        if not PYARROW_AVAILABLE:
+            return build()
+        path = self.path_for(name, params)
+        if not os.path.exists(path):
+            self.write(build(), path)
+        return self.read(path)
+
+    def load_days(self, name, params, dates, build_days):
+        """Return the frame for a window of days, stored one file per day.
+        Only days without a file are built: build_days(missing_dates) must
+        yield one frame per missing date, in order. A daily rollover of a
+        30-day window therefore generates one day and reads 29 files. Each
+        day file is mapped, but the frame spanning them is a private copy:
+        to_pandas joins the per-day chunks of every column."""
+        if not PYARROW_AVAILABLE:
+            return pd.concat(build_days(list(dates)), ignore_index=True)
+        tables = [pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+                  for path in self.day_paths(name, params, dates, build_days)]
+        return pa.concat_tables(tables).to_pandas(split_blocks=True)
+
+    def scan_days(self, name, params, dates, build_days, columns=None, filters=None, batch_rows=None):
+        """Stream a window of days as DataFrame chunks instead of one frame.
+        Only the day files in `dates` are opened, only `columns` are read
+        and only rows whose values are in filters[column] are kept; the
+        filter is evaluated inside the Arrow scan, so pruned columns and
+        rejected rows are never converted to pandas. Chunks hold at most
+        batch_rows rows and never span two days. Missing days are built
+        first, as in load_days."""
+        filters = filters or {}
+        if not PYARROW_AVAILABLE:
+            for day_df in build_days(list(dates)):
+                for col, values in filters.items():
+                    day_df = day_df[day_df[col].isin(values)]
+                day_df = day_df if columns is None else day_df[columns]
+                step = batch_rows or max(len(day_df), 1)
+                for start in range(0, len(day_df), step):
+                    yield day_df.iloc[start:start + step]
+            return
+        predicate = None
+        for col, values in filters.items():
+            term = pads.field(col).isin(list(values))
+            predicate = term if predicate is None else predicate & term
+        scan_args = {'columns': columns, 'filter': predicate}
+        if batch_rows:
+            scan_args['batch_size'] = batch_rows
+        for path in self.day_paths(name, params, dates, build_days):
+            for batch in pads.dataset(path, format='ipc').to_batches(**scan_args):
+                if batch.num_rows:
+                    yield batch.to_pandas(split_blocks=True)
+
+    def day_paths(self, name, params, dates, build_days):
+        """Paths of the day files for `dates`, building any that are missing."""
+        part_dir = self.path_for(name, params)[:-len('.arrow')]
+        paths = {date: os.path.join(part_dir, f"{date:%Y-%m-%d}.arrow") for date in dates}
+        missing = [date for date in dates if not os.path.exists(paths[date])]
+        if missing:
+            for date, day_df in zip(missing, build_days(missing)):
+                self.write(day_df, paths[date])
+            self.prune_days(part_dir, min(dates))
+        return [paths[date] for date in dates]
+
+    def snapshot_path(self, name, params):
+        """Snapshots live in their own directory: they cannot be rebuilt
+        from the generator, so prune() must never age them out."""
+        return os.path.join(self.root, 'snapshots', os.path.basename(self.path_for(name, params)))
+
+    def load_snapshot(self, name, params):
+        """Stored frame for (name, params), or None if there is none yet.
+        For state that is extended in place rather than rebuilt."""
+        if not PYARROW_AVAILABLE:
+            return None
+        path = self.snapshot_path(name, params)
+        legacy_path = self.path_for(name, params)  # Where snapshots were kept before
+        if not os.path.exists(path) and os.path.exists(legacy_path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                os.replace(legacy_path, path)
+            except OSError:
+                pass  # Another process moved it first
+        if not os.path.exists(path):
+            return None
+        return self.read(path)
+
+    def save_snapshot(self, df, name, params):
+        if PYARROW_AVAILABLE:
+            self.write(df, self.snapshot_path(name, params))
+
+    def read(self, path):
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        # split_blocks lets numeric columns stay zero-copy views of the map
+        return table.to_pandas(split_blocks=True)
+
+    def write(self, df, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+        if os.path.dirname(path) == self.root:
+            self.prune()
+
+    def prune(self):
+        """Drop dataset files that have not been rewritten for max_age_days.
+        Only the store's own .arrow files are aged out; other caches kept in
+        the same directory (sentiment scores, topic models) are left alone."""
+        cutoff = time.time() - self.max_age_days * 86400
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith('.arrow') and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass  # Another process pruned it first
+
+    def prune_days(self, part_dir, window_start):
+        """Drop day files more than max_age_days older than the window start.
+        Day files are never rewritten, so they are aged by name, not mtime."""
+        cutoff = f"{window_start - timedelta(days=self.max_age_days):%Y-%m-%d}.arrow"
+        for entry in os.scandir(part_dir):
+            if entry.name.endswith('.arrow') and entry.name < cutoff:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
@@ -0,0 +1,216 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# Sentiment Engine - news sentiment scoring and per-document score cache
+# Kept free of Streamlit so it can be shared across sessions and processes
+# ══════════════════════════════════════════════════════════════════════════════
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from cex_data import map_partitions
+
+try:
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    VADER_AVAILABLE = True
+except ImportError:
+    VADER_AVAILABLE = False
+
+SENTIMENT_FIELDS = ['compound', 'pos', 'neg', 'neu']
+SENTIMENT_CACHE_ITEMS = 200_000  # Documents kept in memory per scorer
+SCORE_BATCH_SIZE = 2000  # Documents per task sent to a scoring worker
+POS_WORDS = ['surge', 'rally', 'gain', 'bull', 'boost', 'record', 'positive', 'growth', 'breakout', 'adoption']
+NEG_WORDS = ['drop', 'crash', 'sell', 'bear', 'fear', 'hack', 'risk', 'decline', 'crackdown', 'vulnerability']
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# BATCH SCORING
+# Documents scored in batches, across a process pool for large corpora
+# ══════════════════════════════════════════════════════════════════════════════
+
+@lru_cache(maxsize=1)
+def _analyzer():
+    """One VADER analyzer per process, reused by every batch it scores."""
+    return SentimentIntensityAnalyzer()
+
+
+def _vader_batch(texts):
+    analyzer = _analyzer()
+    # Python round(), not np.round: keeps scores identical to per-item scoring
+    scores = [[round(s[f], 3) for f in SENTIMENT_FIELDS] for s in map(analyzer.polarity_scores, texts)]
+    return np.array(scores, dtype=np.float64).reshape(-1, len(SENTIMENT_FIELDS))
+
+
+def _keyword_batch(texts):
+    """Keyword fallback: +/-0.3 per positive/negative word found, clipped to
+    [-1, 1]; word tests run over the whole batch at once."""
+    lower = pd.Series(texts, dtype=object).str.lower()
+    pos = sum(lower.str.contains(w, regex=False).to_numpy(dtype=np.int64) for w in POS_WORDS)
+    neg = sum(lower.str.contains(w, regex=False).to_numpy(dtype=np.int64) for w in NEG_WORDS)
+    compound = np.clip((pos - neg) * 0.3, -1, 1)
+    return np.column_stack([compound, np.maximum(0, compound), np.maximum(0, -compound), 1 - np.abs(compound)]).round(3)
+
+
+_BATCH_SCORERS = {'vader': _vader_batch, 'keyword': _keyword_batch}
+
+
+def _score_batch_task(task):
+    scorer, texts = task
+    return _BATCH_SCORERS[scorer](texts)
+
+
+def score_documents(texts, scorer='vader', workers=1, batch_size=SCORE_BATCH_SIZE, pool=None):
+    """Score texts with 'vader' or 'keyword', returning one float array per
+    SENTIMENT_FIELDS entry. Texts are cut into batches of batch_size; with
+    workers > 1 and more than one batch, batches run in a process pool.
+    Pass a long-lived pool (cex_data.process_pool) so workers, and the
+    analyzer each one builds, are reused across calls."""
+    texts = list(texts)
+    tasks = [(scorer, texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+    scores = np.concatenate(list(map_partitions(_score_batch_task, tasks, workers, pool)) or
+                            [np.empty((0, len(SENTIMENT_FIELDS)))])
+    return {field: scores[:, i] for i, field in enumerate(SENTIMENT_FIELDS)}
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# COIN MENTIONS
+# One compiled whole-word pattern for every coin keyword
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _trie_pattern(words):
+    """Regex alternation of words factored into a prefix trie, so keywords
+    sharing a prefix ("eth", "ethereum") are tried as one branch and the
+    pattern stays cheap with hundreds of keywords."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}  # End of a word
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if '' in node:  # A word ends here; longer words are optional
+            return f"(?:{body})?" if len(branches) == 1 else f"{body}?"
+        return body
+
+    return build(trie)
+
+
+class CoinMatcher:
+    """Coin mentions from {coin: [keywords]}, compiled once. Keywords match
+    case-insensitively as whole words only, so "dot" is not found in
+    "anecdote" nor "sol" in "solid"; a document is scanned once whatever
+    the number of keywords. Coins come back in keyword-dict order, or
+    ["GENERAL"] when none is mentioned."""
+
+    def __init__(self, coin_keywords):
+        self.coins = list(coin_keywords)
+        self.rank = {kw.lower(): i for i, kws in enumerate(coin_keywords.values()) for kw in kws}
+        self.pattern = re.compile(rf"\b{_trie_pattern(self.rank)}\b", re.IGNORECASE)
+
+    def _coins(self, matches):
+        ranks = sorted({self.rank[m.lower()] for m in matches})
+        return [self.coins[i] for i in ranks] if ranks else ["GENERAL"]
+
+    def find(self, text):
+        """Coins mentioned in one text."""
+        return self._coins(self.pattern.findall(text))
+
+    def find_series(self, texts):
+        """Coins mentioned in each text of a Series (or list), as a Series
+        of lists aligned with the input."""
+        texts = pd.Series(texts, dtype=object)
+        return texts.fillna('').str.findall(self.pattern).map(self._coins)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# SCORE CACHE
+# Scores keyed by a hash of title + description; LRU in memory, JSON-lines on disk
+# ══════════════════════════════════════════════════════════════════════════════
+
+def document_key(title, description=""):
+    """Content hash of a news item: the same headline and description always
+    map to the same key, whichever feed or refresh delivered them."""
+    return hashlib.sha1(f"{title}\x00{description}".encode('utf-8')).hexdigest()
+
+
+class SentimentCache:
+    """Sentiment scores (SENTIMENT_FIELDS order) by document_key().
+    At most max_items documents are held, least recently used evicted first.
+    New scores are appended to a JSON-lines file that is replayed on start,
+    so a restart scores nothing already seen; once the file holds twice
+    max_items lines it is rewritten from the live entries."""
+
+    def __init__(self, path, max_items=SENTIMENT_CACHE_ITEMS):
+        self.path = path
+        self.max_items = max_items
+        self._entries = OrderedDict()  # key -> [compound, pos, neg, neu]
+        self._lines = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    key, scores = json.loads(line)
+                except ValueError:
+                    continue  # Torn final line from an interrupted append
+                self._entries[key] = scores
+                self._entries.move_to_end(key)
+                self._lines += 1
+        self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_items:
+            self._entries.popitem(last=False)
+
+    def get_many(self, keys):
+        """Scores for each key, or None where the document is unseen."""
+        with self._lock:
+            found = []
+            for key in keys:
+                scores = self._entries.get(key)
+                if scores is not None:
+                    self._entries.move_to_end(key)
+                found.append(scores)
+            return found
+
+    def put_many(self, scores_by_key):
+        """Store new scores and append them to the backing file."""
+        if not scores_by_key:
+            return
+        with self._lock:
+            for key, scores in scores_by_key.items():
+                self._entries[key] = list(scores)
+                self._entries.move_to_end(key)
+            self._evict()
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            if self._lines + len(scores_by_key) > 2 * self.max_items:
+                self._rewrite()
+            else:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps([key, list(scores)]) + "\n" for key, scores in scores_by_key.items())
+                self._lines += len(scores_by_key)
+
+    def _rewrite(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps([key, scores]) + "\n" for key, scores in self._entries.items())
+        os.replace(tmp_path, self.path)
+        self._lines = len(self._entries)
@@ -0,0 +1,198 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# Topic Engine - online LDA over news headlines, persisted between refreshes
+# Kept free of Streamlit so models can be updated off the script thread
+# ══════════════════════════════════════════════════════════════════════════════
+
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from sentiment import document_key
+
+try:
+    from sklearn.decomposition import LatentDirichletAllocation
+    from sklearn.feature_extraction.text import HashingVectorizer
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+TOPIC_HASH_FEATURES = 2 ** 14  # Hashed vocabulary size, fixed for the model's lifetime
+TOPIC_TOTAL_DOCS = 10_000  # Corpus size the online updates are scaled to
+TOPIC_FIRST_PASSES = 10  # partial_fit passes over the first batch (max_iter of a batch fit)
+TOPIC_UPDATE_PASSES = 3  # partial_fit passes over each later batch of new documents
+TOPIC_CACHED_DOCS = 50_000  # Doc-topic rows kept per model
+TOPIC_MODEL_VERSION = 1  # Bump when the vectorizer or model settings change
+
+
+class OnlineTopicModel:
+    """LDA topics over a stream of headlines, trained incrementally.
+    The vocabulary is a HashingVectorizer, so it never has to be refitted
+    as words appear; hashed columns are mapped back to the tokens seen in
+    them for display. update() runs partial_fit on unseen documents only
+    and keeps each document's topic row, keyed by content hash, so an
+    already-seen headline costs a lookup. Earlier rows are not revised
+    when later batches move the topics."""
+
+    def __init__(self, n_topics, random_state=42):
+        self.n_topics = n_topics
+        self.version = TOPIC_MODEL_VERSION
+        self.vectorizer = HashingVectorizer(n_features=TOPIC_HASH_FEATURES, alternate_sign=False, norm=None,
+                                            stop_words='english')
+        self.lda = LatentDirichletAllocation(n_components=n_topics, learning_method='online',
+                                             total_samples=TOPIC_TOTAL_DOCS, random_state=random_state)
+        self.doc_topics = OrderedDict()  # document_key -> topic distribution row
+        self.terms = {}  # hashed column -> {token: count}
+        self.n_docs = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, n_topics):
+        """The model stored at path, or a new one if there is none (or it was
+        written by different settings)."""
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    model = pickle.load(f)
+                if model.version == TOPIC_MODEL_VERSION and model.n_topics == n_topics:
+                    return model
+            except Exception:
+                pass  # Unreadable or stale file: start over
+        return cls(n_topics)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with self._lock, open(tmp_path, 'wb') as f:
+            pickle.dump(self, f)
+        os.replace(tmp_path, path)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _learn_terms(self, texts):
+        """Remember which tokens land in which hashed column."""
+        analyze = self.vectorizer.build_analyzer()
+        counts = {}
+        for text in texts:
+            for token in analyze(text):
+                counts[token] = counts.get(token, 0) + 1
+        if not counts:
+            return
+        tokens = list(counts)
+        columns = self.vectorizer.transform(tokens).indices
+        for token, col in zip(tokens, columns):
+            col_terms = self.terms.setdefault(int(col), {})
+            col_terms[token] = col_terms.get(token, 0) + counts[token]
+
+    def update(self, texts):
+        """Doc-topic rows for texts, fitting the model on unseen ones first.
+        Returns an empty array when no text has a usable token."""
+        keys = [document_key(text) for text in texts]
+        with self._lock:
+            new = OrderedDict((key, text) for key, text in zip(keys, texts) if key not in self.doc_topics)
+            if new:
+                doc_term = self.vectorizer.transform(list(new.values()))
+                if doc_term.nnz == 0 and not self.n_docs:
+                    return np.array([])
+                passes = TOPIC_FIRST_PASSES if not self.n_docs else TOPIC_UPDATE_PASSES
+                for _ in range(passes):
+                    self.lda.partial_fit(doc_term)
+                self._learn_terms(new.values())
+                self.n_docs += len(new)
+                for key, row in zip(new, self.lda.transform(doc_term)):
+                    self.doc_topics[key] = row
+            rows = []
+            for key in keys:
+                self.doc_topics.move_to_end(key)
+                rows.append(self.doc_topics[key])
+            while len(self.doc_topics) > max(TOPIC_CACHED_DOCS, len(set(keys))):
+                self.doc_topics.popitem(last=False)
+            return np.vstack(rows) if rows else np.array([])
+
+    def topics(self, n_top_words=10):
+        """Top words per topic, as topic dicts for the dashboard."""
+        with self._lock:
+            if not self.n_docs:
+                return []
+            columns = np.fromiter(self.terms, dtype=np.int64, count=len(self.terms))
+            words = [max(self.terms[col], key=self.terms[col].get) for col in columns]
+            weights = self.lda.components_[:, columns]
+        topics = []
+        for idx, topic in enumerate(weights):
+            top = topic.argsort()[-n_top_words:][::-1]
+            topics.append({"topic_id": idx, "label": f"Topic {idx + 1}",
+                           "words": [words[i] for i in top], "weights": [float(topic[i]) for i in top]})
+        return topics
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# BACKGROUND PRE-WARMING
+# Every n_topics value fitted off the script thread as soon as a corpus arrives
+# ══════════════════════════════════════════════════════════════════════════════
+
+class TopicModelWarmer:
+    """Runs fit(texts, n_topics) for every value in counts on a background
+    thread whenever a new corpus is seen, so switching n_topics reads a
+    finished result instead of fitting on demand. Results are kept for the
+    max_corpora most recent corpora (sessions may read different feeds);
+    fits still queued for an older corpus are cancelled."""
+
+    def __init__(self, fit, counts, workers=1, max_corpora=4):
+        self.fit = fit
+        self.counts = list(counts)
+        self.max_corpora = max_corpora
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='topic-models')
+        self._futures = OrderedDict()  # corpus hash -> {n_topics: Future}
+        self._lock = threading.Lock()
+
+    def warm(self, texts, first=None):
+        """Futures of the fit for each count on this corpus. For a new
+        corpus, fits are queued with `first` ahead of the others."""
+        corpus = document_key("\n".join(texts))
+        with self._lock:
+            if corpus not in self._futures:
+                self._futures[corpus] = {n: self._executor.submit(self.fit, texts, n)
+                                         for n in sorted(self.counts, key=lambda n: n != first)}
+                while len(self._futures) > self.max_corpora:
+                    for future in self._futures.popitem(last=False)[1].values():
+                        future.cancel()
+            self._futures.move_to_end(corpus)
+            return dict(self._futures[corpus])
+
+    @staticmethod
+    def _failed(future):
+        return future.done() and (future.cancelled() or future.exception() is not None)
+
+    def result(self, texts, n_topics):
+        """Result of the fit for n_topics, waiting for it. A fit that failed
+        in the background is redone on the calling thread, so its error is
+        raised there rather than replayed from the future on every call."""
+        future = self.warm(texts, first=n_topics)[n_topics]
+        try:
+            return future.result()
+        except Exception:
+            return self.fit(texts, n_topics)
+
+    def nearest_ready(self, texts, n_topics):
+        """(count, result) of the finished fit closest to n_topics, preferring
+        n_topics itself, or None while nothing for this corpus is done.
+        Failed fits are skipped, except a failed n_topics fit, which is
+        redone on the calling thread as in result()."""
+        futures = self.warm(texts, first=n_topics)
+        if self._failed(futures[n_topics]):
+            return n_topics, self.fit(texts, n_topics)
+        ready = [n for n, future in futures.items() if future.done() and not self._failed(future)]
+        if not ready:
+            return None
+        n = min(ready, key=lambda n: (abs(n - n_topics), n))
+        return n, futures[n].result()